@@ -0,0 +1,218 @@
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fastapi.encoders import jsonable_encoder
+from config import (ALERT_ENTER_PROFIT, ALERT_EXIT_PROFIT, ALERT_COOLDOWN_SECONDS, ALERT_SINKS, ALERT_HISTORY_SIZE)
+from lib.http_client import get_client
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class FileSink:
+    """Appends each alert as one JSON line."""
+    def __init__(self, path: str):
+        self.name = f"file:{path}"
+        self.path = path
+
+    def send(self, alert: dict):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(jsonable_encoder(alert)) + '\n')
+
+class WebhookSink:
+    """POSTs each alert as JSON through the shared HTTP client (pooled, retried)."""
+    def __init__(self, url: str):
+        self.name = url
+        self.url = url
+
+    def send(self, alert: dict):
+        get_client().post(self.url, json=jsonable_encoder(alert)).raise_for_status()
+
+def sinks_from_config(spec: str = ALERT_SINKS) -> list:
+    """'file:alerts.jsonl,http://127.0.0.1:9200/alerts' -> [FileSink, WebhookSink]."""
+    sinks = []
+    for target in filter(None, (part.strip() for part in spec.split(','))):
+        if target.startswith('file:'):
+            sinks.append(FileSink(target[len('file:'):]))
+        elif target.startswith(('http://', 'https://')):
+            sinks.append(WebhookSink(target))
+        else:
+            raise ValueError(f"Unknown alert sink {target!r}")
+    return sinks
+
+class _PairState:
+    __slots__ = ('open', 'announced', 'last_alert', 'episode')
+
+    def __init__(self):
+        self.open = False        # Above the enter threshold and not yet below the exit one
+        self.announced = False   # This opening's alert was sent (not suppressed by the cooldown)
+        self.last_alert = None   # time.monotonic() of the last 'open' alert sent for this pair
+        self.episode = 0         # Bumped on every announced open, so alert ids are stable per episode
+
+class Alerter:
+    """
+    Price book listener that turns profit recomputations (scans and live ticks
+    alike) into alerts. A pair opens when its profit reaches `enter_profit` and
+    closes only once it drops below `exit_profit`, so a price hovering at the
+    threshold does not flap. An 'open' alert is sent at most once per
+    `cooldown_seconds` per pair, its 'close' only if the open was sent, and
+    every alert carries an id stable for that pair's episode so a sink can
+    dedup a redelivery. Delivery happens on a background thread; the time from
+    the price observation (the record's last_updated) to each sink's delivery
+    lands in alert_latency_seconds. Records observed before the alerter was
+    created (prices reloaded from the database at startup) never open a pair:
+    their episode state was lost with the previous process.
+    """
+    def __init__(self, sinks=None, enter_profit: float = ALERT_ENTER_PROFIT, exit_profit: float = ALERT_EXIT_PROFIT,
+                 cooldown_seconds: float = ALERT_COOLDOWN_SECONDS, history_size: int = ALERT_HISTORY_SIZE):
+        if exit_profit > enter_profit:
+            raise ValueError("exit_profit must not exceed enter_profit")
+        self.sinks = sinks_from_config() if sinks is None else sinks
+        self.enter_profit = enter_profit
+        self.exit_profit = exit_profit
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._pairs = {}  # kalshi_ticker -> _PairState
+        self._version = -1
+        self._queue = queue.Queue()
+        self._recent = deque(maxlen=history_size)  # delivered alerts, oldest first
+        self._latencies = deque(maxlen=history_size)
+        self._thread = None
+        self.started_at = datetime.now()
+
+    def on_snapshot(self, snapshot):
+        """PriceBook listener; cheap enough to run on the scanner thread or the live feed loop."""
+        now = time.monotonic()
+        records = {r['kalshi_ticker']: r for r in snapshot.arbitrage}
+        alerts = []
+        with self._lock:
+            if snapshot.version <= self._version:
+                return
+            self._version = snapshot.version
+            for ticker, record in records.items():
+                profit = record['profit'] or 0
+                state = self._pairs.get(ticker)
+                if state is None:
+                    if profit < self.enter_profit or (record['last_updated'] or self.started_at) < self.started_at:
+                        continue
+                    state = self._pairs[ticker] = _PairState()
+                if not state.open and profit >= self.enter_profit:
+                    state.open = True
+                    state.announced = state.last_alert is None or now - state.last_alert >= self.cooldown_seconds
+                    if state.announced:
+                        state.last_alert = now
+                        state.episode += 1
+                        alerts.append(self._alert('open', ticker, state, record))
+                    else:
+                        metrics.ALERTS.inc(kind='open', result='cooldown')
+                elif state.open and profit < self.exit_profit:
+                    alerts.extend(self._close(ticker, state, record))
+            # Pairs gone from the book (expired, or dropped by their league's scan) close as well
+            for ticker in [t for t, state in self._pairs.items() if t not in records]:
+                alerts.extend(self._close(ticker, self._pairs[ticker], None))
+            # Forget closed pairs whose cooldown has run out
+            for ticker in [t for t, state in self._pairs.items()
+                           if not state.open and (state.last_alert is None
+                                                  or now - state.last_alert >= self.cooldown_seconds)]:
+                del self._pairs[ticker]
+        for alert in alerts:
+            self._queue.put(alert)
+
+    def _close(self, ticker: str, state: _PairState, record):
+        if not state.open:
+            return []
+        state.open = False
+        # An open suppressed by the cooldown was never announced, so neither is its close
+        return [self._alert('close', ticker, state, record)] if state.announced else []
+
+    def _alert(self, kind: str, ticker: str, state: _PairState, record) -> dict:
+        return {
+            "id": f"{ticker}:{state.episode}:{kind}",
+            "kind": kind,
+            "kalshi_ticker": ticker,
+            "record": record,
+            "observed_at": (record or {}).get('last_updated') or datetime.now(),
+            "alerted_at": datetime.now(),
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._deliver_loop, name="sentinel-alerts", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _deliver_loop(self):
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                return
+            self.deliver(alert)
+
+    def deliver(self, alert: dict):
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+            except Exception as e:
+                metrics.ALERTS.inc(kind=alert['kind'], result='error')
+                logger.warning("Alert %s to %s failed: %s", alert['id'], sink.name, e)
+                continue
+            latency = (datetime.now() - alert['observed_at']).total_seconds()
+            metrics.ALERT_LATENCY_SECONDS.observe(latency, sink=sink.name)
+            metrics.ALERTS.inc(kind=alert['kind'], result='sent')
+            with self._lock:
+                self._latencies.append(latency)
+        with self._lock:
+            self._recent.append(alert)
+
+    def status(self) -> dict:
+        """Recently delivered alerts (newest first) and observation-to-delivery latency percentiles."""
+        with self._lock:
+            recent = list(self._recent)[::-1]
+            latencies = sorted(self._latencies)
+            open_pairs = sum(1 for state in self._pairs.values() if state.open)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+        return {
+            "enter_profit": self.enter_profit,
+            "exit_profit": self.exit_profit,
+            "cooldown_seconds": self.cooldown_seconds,
+            "sinks": [sink.name for sink in self.sinks],
+            "open_pairs": open_pairs,
+            "pending": self._queue.qsize(),
+            "latency_seconds": {"p50": percentile(0.5), "p95": percentile(0.95),
+                                "max": latencies[-1] if latencies else None},
+            "alerts": recent,
+        }
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        alert = json.loads(self.rfile.read(int(self.headers.get('content-length', 0))))
+        self.send_response(204)
+        self.end_headers()
+        latency = (datetime.now() - datetime.fromisoformat(alert['observed_at'])).total_seconds()
+        record = alert.get('record') or {}
+        print(f"{alert['kind']:<5} {alert['kalshi_ticker']} profit={record.get('profit')} "
+              f"direction={record.get('direction')} latency={latency * 1000:.1f}ms", flush=True)
+
+    def log_message(self, *args):
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local webhook receiver that prints alerts and their latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+    print(f"Receiving alerts on http://{args.host}:{args.port}/ "
+          f"(set ALERT_SINKS=http://{args.host}:{args.port}/alerts)", flush=True)
+    ThreadingHTTPServer((args.host, args.port), _ReceiverHandler).serve_forever()
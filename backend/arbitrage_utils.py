@@ -2,9 +2,7 @@ from typing import List, Dict, Tuple, Optional
 from decimal import Decimal
 from datetime import datetime, timedelta
 from models import KalshiMarket, PolymarketMarket, MarketMatchMap
-import json
-with open('lib/dictionaries/abbreviations.json', 'r') as f:
-    kalshi_poly_dict = json.load(f)
+from lib.team_resolver import is_same_team
 
 ### Staleness Checker ###
 def needs_update(last_updated: Optional[datetime], threshold_minutes: int = 30) -> bool:
@@ -61,5 +59,14 @@ def detect_arbitrage(
             })
     return opportunities
 
-def is_same_team(kalshi_team_code, outcome_name, league):
-    return kalshi_poly_dict[league][kalshi_team_code]['name'] == outcome_name
+def best_arbitrage(
+    kalshi_market: KalshiMarket,
+    polymarket_market: PolymarketMarket,
+    min_profit: Decimal = Decimal('0.0')
+) -> Tuple[Decimal, Optional[str]]:
+    """(profit, direction) of the most profitable opportunity for a pair, or (0, None)."""
+    arbs = detect_arbitrage(kalshi_market, polymarket_market, min_profit)
+    if not arbs:
+        return Decimal('0'), None
+    best_arb = max(arbs, key=lambda x: x['profit'])
+    return Decimal(str(best_arb['profit'])), best_arb['type']
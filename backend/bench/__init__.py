@@ -0,0 +1,10 @@
+"""Scan benchmarks against a local mock exchange; see bench/run.py."""
+
+def base_urls(host: str, port: int) -> dict:
+    """Environment overrides pointing the lib fetchers at a MockExchange on host:port."""
+    origin = f"http://{host}:{port}"
+    return {
+        "KALSHI_API_BASE": f"{origin}/kalshi/trade-api/v2",
+        "POLY_GAMMA_API_BASE": f"{origin}/gamma",
+        "POLY_CLOB_API_BASE": f"{origin}/clob",
+    }
@@ -0,0 +1,93 @@
+"""
+Deterministic market fixtures for the benchmark.
+
+A fixture is one JSON-serialisable dict holding everything the mock exchange
+serves: Kalshi markets per series, Gamma market payloads keyed by slug, and
+the /sports and /events catalog built from them. `generate(size, seed)`
+always returns the same fixture for the same arguments; `save`/`load` let a
+set be recorded once (or captured from the live APIs) and replayed.
+"""
+import json
+import random
+from datetime import date, timedelta
+from lib.match_market import MarketMatcher
+from lib.team_resolver import LEAGUES, kalshi_poly_dict, parse_ticker
+
+SIZES = (100, 1000, 10000)
+DEFAULT_SEED = 7
+FIRST_GAME_DATE = date(2030, 1, 5)  # Far enough ahead that the slug cache never treats games as finished
+POLYMARKET_COVERAGE = 0.85  # Share of Kalshi games that also exist on Polymarket
+ARBITRAGE_SHARE = 0.05      # Share of listed games priced so one direction pays
+
+def _cents(value: float) -> str:
+    return f"{min(0.99, max(0.01, round(value, 2))):.4f}"
+
+def _game_tickers(rng, league, game_date, seen):
+    codes = sorted(kalshi_poly_dict[league])
+    while True:
+        away, home = rng.sample(codes, 2)
+        event_ticker = f"KX{league}GAME-{game_date:%y}{game_date:%b}{game_date:%d}{away}{home}".upper()
+        info = parse_ticker(f"{event_ticker}-{away}")
+        # Some code pairs concatenate ambiguously; keep only tickers that parse back
+        if event_ticker not in seen and info and (info.away, info.home) == (away, home):
+            seen.add(event_ticker)
+            return event_ticker, away, home
+
+def generate(size: int, seed: int = DEFAULT_SEED) -> dict:
+    """Fixture with `size` Kalshi markets (two per game) spread over the leagues."""
+    rng = random.Random(f"{seed}:{size}")
+    matcher = MarketMatcher()
+    series = {f"KX{league}GAME": [] for league in LEAGUES}
+    polymarket = {}
+    seen = set()
+    for game in range(size // 2):
+        league = LEAGUES[game % len(LEAGUES)]
+        game_date = FIRST_GAME_DATE + timedelta(days=game // (len(LEAGUES) * 8))
+        event_ticker, away, home = _game_tickers(rng, league, game_date, seen)
+        home_win = rng.uniform(0.2, 0.8)
+        for code, fair in ((away, 1 - home_win), (home, home_win)):
+            spread = rng.choice((0.01, 0.01, 0.02))
+            series[f"KX{league}GAME"].append({
+                "ticker": f"{event_ticker}-{code}",
+                "event_ticker": event_ticker,
+                "title": f"{kalshi_poly_dict[league][away]['name']} at {kalshi_poly_dict[league][home]['name']} Winner?",
+                "status": "active",
+                "yes_ask_dollars": _cents(fair + spread),
+                "no_ask_dollars": _cents(1 - fair + spread),
+            })
+        if rng.random() >= POLYMARKET_COVERAGE:
+            continue
+        slug = matcher._exact_match_sports_slug(f"{event_ticker}-{away}")
+        skew = rng.choice((-0.06, 0.06)) if rng.random() < ARBITRAGE_SHARE else rng.uniform(-0.01, 0.01)
+        away_price = round(min(0.99, max(0.01, 1 - home_win + skew)), 3)
+        polymarket[slug] = {
+            "slug": slug,
+            "question": f"{kalshi_poly_dict[league][away]['name']} vs. {kalshi_poly_dict[league][home]['name']}",
+            "outcomes": json.dumps([kalshi_poly_dict[league][away]['name'], kalshi_poly_dict[league][home]['name']]),
+            "outcomePrices": json.dumps([str(away_price), str(round(1 - away_price, 3))]),
+            "clobTokenIds": json.dumps([f"{slug}-away", f"{slug}-home"]),
+            "active": True,
+            "closed": False,
+            "league": league.lower(),
+        }
+    return {"seed": seed, "size": size, "kalshi_series": series, "polymarket": polymarket}
+
+def sports(fixture: dict) -> list:
+    """Gamma /sports listing: one series id per league."""
+    return [{"sport": league.lower(), "series": str(1000 + i)} for i, league in enumerate(LEAGUES)]
+
+def events_by_series(fixture: dict) -> dict:
+    """Gamma /events pages per series id: one event per game, embedding its market."""
+    series_ids = {s["sport"]: s["series"] for s in sports(fixture)}
+    events = {series_id: [] for series_id in series_ids.values()}
+    for slug, market in sorted(fixture["polymarket"].items()):
+        events[series_ids[market["league"]]].append({"slug": slug, "closed": False, "markets": [market]})
+    return events
+
+def save(fixture: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
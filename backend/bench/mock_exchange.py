@@ -0,0 +1,159 @@
+"""
+Local stand-in for the Kalshi and Polymarket HTTP APIs, served from a fixture.
+
+Mounted under one origin:
+  /kalshi/trade-api/v2/markets                   cursor-paged, filtered by series_ticker
+  /kalshi/trade-api/v2/markets/{ticker}/orderbook
+  /gamma/markets/slug/{slug}, /gamma/sports, /gamma/events (series_id/limit/offset paged)
+  /clob/books                                    POST [{"token_id": ...}]
+Every response is delayed by `latency_ms` (plus up to `jitter_ms`) and counted
+per route. Point KALSHI_API_BASE / POLY_GAMMA_API_BASE / POLY_CLOB_API_BASE at
+`bench.base_urls(host, port)` before the backend's lib modules are imported.
+
+    python -m bench.mock_exchange --size 1000 --latency-ms 20 --port 9100
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from bench import base_urls, fixtures
+
+DEPTH_LEVELS = 3
+
+def _kalshi_book(market: dict) -> dict:
+    """YES bids mirror the NO ask and vice versa, three levels deep."""
+    def bids(ask):
+        top = round(100 - float(ask) * 100)
+        return [[top - i, 50 * 2 ** i] for i in reversed(range(DEPTH_LEVELS)) if top - i > 0]
+    return {"yes": bids(market["no_ask_dollars"]), "no": bids(market["yes_ask_dollars"])}
+
+def _clob_book(token_id: str, price: float) -> dict:
+    return {
+        "asset_id": token_id,
+        "bids": [{"price": f"{price - 0.01 * (i + 1):.2f}", "size": str(100 * 2 ** i)}
+                 for i in range(DEPTH_LEVELS) if price - 0.01 * (i + 1) > 0],
+        "asks": [{"price": f"{price + 0.01 * i:.2f}", "size": str(100 * 2 ** i)}
+                 for i in range(DEPTH_LEVELS) if price + 0.01 * i < 1],
+    }
+
+class MockExchange:
+    def __init__(self, fixture: dict, latency_ms: float = 0, jitter_ms: float = 0,
+                 host: str = "127.0.0.1", port: int = 9100):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.host = host
+        self.port = port
+        self.requests = Counter()  # route -> count
+        self._rng = random.Random(0)
+        self._server = None
+        self._thread = None
+        self.use(fixture)
+        self.app = self._build_app()
+
+    def use(self, fixture: dict):
+        """Swaps the served fixture (and resets the counters) without restarting the server."""
+        self.fixture = fixture
+        self._markets = {m["ticker"]: m for ms in fixture["kalshi_series"].values() for m in ms}
+        self._tokens = {}
+        for market in fixture["polymarket"].values():
+            for token_id, price in zip(json.loads(market["clobTokenIds"]), json.loads(market["outcomePrices"])):
+                self._tokens[token_id] = float(price)
+        self._sports = fixtures.sports(fixture)
+        self._events = fixtures.events_by_series(fixture)
+        self.reset_counts()
+
+    def base_urls(self) -> dict:
+        return base_urls(self.host, self.port)
+
+    def reset_counts(self):
+        self.requests.clear()
+
+    async def _delay(self, route: str):
+        self.requests[route] += 1
+        delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/kalshi/trade-api/v2/markets")
+        async def markets(series_ticker: str, status: str = "open", limit: int = Query(100, le=1000),
+                          cursor: str = ""):
+            await self._delay("kalshi/markets")
+            listed = self.fixture["kalshi_series"].get(series_ticker, [])
+            start = int(cursor or 0)
+            end = start + limit
+            return {"markets": listed[start:end], "cursor": str(end) if end < len(listed) else ""}
+
+        @app.get("/kalshi/trade-api/v2/markets/{ticker}/orderbook")
+        async def orderbook(ticker: str):
+            await self._delay("kalshi/orderbook")
+            if ticker not in self._markets:
+                raise HTTPException(status_code=404)
+            return {"orderbook": _kalshi_book(self._markets[ticker])}
+
+        @app.get("/gamma/markets/slug/{slug}")
+        async def market_by_slug(slug: str):
+            await self._delay("gamma/markets/slug")
+            if slug not in self.fixture["polymarket"]:
+                raise HTTPException(status_code=404)
+            return self.fixture["polymarket"][slug]
+
+        @app.get("/gamma/sports")
+        async def sports():
+            await self._delay("gamma/sports")
+            return self._sports
+
+        @app.get("/gamma/events")
+        async def events(series_id: str, closed: str = "false", limit: int = 100, offset: int = 0):
+            await self._delay("gamma/events")
+            return self._events.get(series_id, [])[offset:offset + limit]
+
+        @app.post("/clob/books")
+        async def books(request: Request):
+            await self._delay("clob/books")
+            wanted = [item["token_id"] for item in await request.json()]
+            return [_clob_book(t, self._tokens[t]) for t in wanted if t in self._tokens]
+
+        @app.get("/stats")
+        async def stats():
+            return dict(self.requests)
+
+        return app
+
+    def start(self):
+        """Serves on a background thread; returns once the socket is accepting."""
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="mock-exchange", daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(5)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Kalshi/Polymarket APIs served from a benchmark fixture")
+    parser.add_argument("--size", type=int, default=1000, help="Kalshi markets to generate")
+    parser.add_argument("--seed", type=int, default=fixtures.DEFAULT_SEED)
+    parser.add_argument("--fixture", help="replay a recorded fixture file instead of generating one")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    fixture = fixtures.load(args.fixture) if args.fixture else fixtures.generate(args.size, args.seed)
+    exchange = MockExchange(fixture, args.latency_ms, args.jitter_ms, args.host, args.port)
+    for name, url in exchange.base_urls().items():
+        print(f"export {name}={url}")
+    uvicorn.run(exchange.app, host=args.host, port=args.port, log_level="warning")
@@ -1,141 +1,370 @@
-from lib.kalshi_fetcher import get_open_markets_for_series
-from lib.match_market import MarketMatcher
-from models import KalshiMarket, PolymarketMarket, MarketMatchMap
-from arbitrage_utils import detect_arbitrage
-from sqlalchemy.dialects.postgresql import insert
+from lib.kalshi_fetcher import stream_open_markets
+from lib.match_market import MarketMatcher, PolymarketCatalog
+from lib.http_client import HTTP_TIMEOUT_SECONDS, async_client
+from lib.fuzzy_match import kalshi_league, outcome_index
+from models import KalshiMarket, PolymarketMarket, MarketMatchMap, PriceChange, ScanGeneration
+from lib.arbitrage_engine import aligned_prices, price_pair_rows
+from sqlalchemy import all_, bindparam, delete
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session
 from decimal import Decimal
-from datetime import datetime
-import requests, json
+from datetime import datetime, timedelta
+from collections import Counter
+from typing import NamedTuple
+from lib.order_book import order_books, executable_fields, EMPTY_SWEEP
+from config import (SCAN_CONCURRENCY, POLYMARKET_CATALOG_ENABLED, ORDER_BOOK_DEPTH_ENABLED, LEAGUE_SERIES,
+                    CHANGE_LOG_RETENTION_HOURS, OPPORTUNITIES_TABLE_ENABLED)
+from slug_cache import slug_cache
+from sync_state import sync_state
+from opportunities import publish_opportunities
+import asyncio
+import httpx
 import logging
-from tqdm import tqdm
+import metrics
+from metrics import InstrumentedTransport, span
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger
-# Helper to resolve team string between Kalshi and Polymarket outcomes
-from arbitrage_utils import is_same_team
+logger = logging.getLogger(__name__)
+# Helpers to parse tickers and resolve team strings between Kalshi and Polymarket outcomes
+from lib.team_resolver import is_same_team, parse_ticker
 
-def fetch_and_sync_and_calculate_profit(db: Session):
-    matcher = MarketMatcher()
-    SERIES_TICKERS = ["KXNBAGAME", "KXNFLGAME", "KXNHLGAME", "KXMLBGAME"]
-    scan_start_time = datetime.now()
-    print(f"Scan started at {scan_start_time}", flush=True)
+# Rows per multi-row INSERT; keeps bind parameters well under Postgres' 65535 limit
+UPSERT_CHUNK_SIZE = 1000
 
-    all_kalshi = []
-    for ticker in SERIES_TICKERS:
-        all_kalshi.extend(get_open_markets_for_series(ticker))
+LEAGUES = tuple(LEAGUE_SERIES)
+SERIES_TICKERS = [series for league in LEAGUES for series in LEAGUE_SERIES[league]]
 
+def series_for(leagues) -> list:
+    return [series for league in leagues for series in LEAGUE_SERIES[league]]
 
-    print(f"Found {len(all_kalshi)} Kalshi markets", flush=True)
+def event_ticker_of(k_market) -> str:
+    """Kalshi lists one market per team; both share the game's event ticker (e.g. KXNBAGAME-25DEC23BKNPHI)."""
+    info = parse_ticker(k_market.ticker)
+    return k_market.event_ticker or (info.event_ticker if info else k_market.ticker.rsplit('-', 1)[0])
 
-    for k_market in tqdm(all_kalshi, desc="Processing Kalshi Markets"):
-        kalshi_ticker = k_market.get("ticker")
-        kalshi_title = k_market.get("title")
-        league = kalshi_ticker[2:5]
+async def _load_catalog(catalog, client):
+    try:
+        with span('polymarket_catalog'):
+            await catalog.load(client)
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        # Matching falls back to per-slug requests
+        logger.warning("Polymarket catalog load failed: %s", e)
 
-        # print(f"Kalshi ticker: {kalshi_ticker}, League: {league}, Title: {kalshi_title}", flush=True)
+async def _resolve_event(matcher, client, semaphore, k_market, catalog_task=None):
+    """Resolve a game's Polymarket market once, using any one of its team markets, bounded by the semaphore."""
+    if catalog_task is not None:
+        await catalog_task
+    async with semaphore:
+        try:
+            return await matcher.find_polymarket_match_async(k_market, client)
+        except (httpx.HTTPError, KeyError) as e:
+            logger.warning("Polymarket lookup failed for %s: %s", k_market.ticker, e)
+            return None
 
-        if k_market['status'] != 'active':
-            continue
-        
-        # Get Kalshi team code from ticker (last 3 characters after last dash)
-        team_code = kalshi_ticker.split('-')[-1]
-        # Always store the Kalshi market row
-        yes_ask = k_market.get('yes_ask_dollars')
-        no_ask = k_market.get('no_ask_dollars')
-        ask_yes = Decimal(str(yes_ask)) if yes_ask is not None else None
-        ask_no = Decimal(str(no_ask)) if no_ask is not None else None
-        kalshi_market_stmt = insert(KalshiMarket).values(
-            ticker=kalshi_ticker, title=kalshi_title, team=team_code, yes_ask_dollars=ask_yes,
-            no_ask_dollars=ask_no, last_updated=scan_start_time, league=league
-        ).on_conflict_do_update(
-            index_elements=[KalshiMarket.ticker],
-            set_={'title': kalshi_title, 'team': team_code, 'yes_ask_dollars': ask_yes,
-                  'no_ask_dollars': ask_no, 'last_updated': scan_start_time, 'league': league}
+async def fetch_scan_inputs(matcher, series_tickers=SERIES_TICKERS, concurrency=SCAN_CONCURRENCY):
+    """
+    Network stage of a scan: streams every series' markets concurrently, groups
+    active markets by event and starts resolving each game against Polymarket as
+    soon as its first team market arrives, so every game is fetched once.
+    All traffic shares one pooled client with at most `concurrency` Polymarket
+    lookups in flight. When the matcher has a catalog it is loaded alongside the
+    Kalshi stream and games are joined against it locally.
+    Returns [(event_ticker, [KalshiMarketRecord], PolymarketMarketRecord or None)].
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    events, tasks = {}, {}
+    seen = active = 0
+    async with async_client(concurrency + len(series_tickers), HTTP_TIMEOUT_SECONDS,
+                            wrap=InstrumentedTransport) as client:
+        catalog_task = asyncio.create_task(_load_catalog(matcher.catalog, client)) if matcher.catalog else None
+        with span('kalshi_fetch'):
+            async for k_market in stream_open_markets(client, series_tickers):
+                seen += 1
+                if k_market.status != 'active':
+                    continue
+                active += 1
+                event_ticker = event_ticker_of(k_market)
+                if event_ticker not in events:
+                    events[event_ticker] = []
+                    tasks[event_ticker] = asyncio.create_task(_resolve_event(matcher, client, semaphore, k_market,
+                                                                                catalog_task))
+                events[event_ticker].append(k_market)
+        metrics.SCAN_MARKETS.inc(seen - active, outcome='skipped')
+        logger.info("Found %d Kalshi markets across %d events", seen, len(events))
+        # Lookups overlap the Kalshi stream; this is the matching time left after it
+        with span('polymarket_match', events=len(events)):
+            if catalog_task is not None:
+                await catalog_task
+            matches = await asyncio.gather(*tasks.values())
+    return [(event_ticker, events[event_ticker], match) for event_ticker, match in zip(tasks, matches)]
+
+def _bulk_upsert(db: Session, model, rows, index_elements, returning=()):
+    """
+    Multi-row INSERT .. ON CONFLICT DO UPDATE, chunked to stay under the driver's
+    bind-parameter limit. Returns the RETURNING rows when `returning` is given.
+    """
+    results = []
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        stmt = insert(model).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={col: stmt.excluded[col] for col in chunk[0] if col not in index_elements}
         )
-        db.execute(kalshi_market_stmt)
-        db.commit()
-        kalshi_market = db.query(KalshiMarket).filter_by(ticker=kalshi_ticker).one()
+        if returning:
+            results.extend(db.execute(stmt.returning(*returning)).all())
+        else:
+            db.execute(stmt)
+    return results
 
-        match = matcher.find_polymarket_match(k_market)
-        if not match or not match.get('slug'):
-            continue
-        resp = requests.get(f"https://gamma-api.polymarket.com/markets/slug/{match['slug']}")
-        if resp.status_code != 200:
+def _kalshi_row(k_market, scan_start_time):
+    kalshi_ticker = k_market.ticker
+    info = parse_ticker(kalshi_ticker)
+    yes_ask = k_market.yes_ask_dollars
+    no_ask = k_market.no_ask_dollars
+    return {
+        'ticker': kalshi_ticker,
+        'title': k_market.title,
+        # Kalshi team code is the last ticker segment
+        'team': info.team if info else kalshi_ticker.split('-')[-1],
+        'yes_ask_dollars': Decimal(str(yes_ask)) if yes_ask is not None else None,
+        'no_ask_dollars': Decimal(str(no_ask)) if no_ask is not None else None,
+        'last_updated': scan_start_time,
+        'league': info.league if info else kalshi_league(kalshi_ticker),
+    }
+
+def _polymarket_row(match, league, scan_start_time):
+    """Builds the PolymarketMarket row from a matched PolymarketMarketRecord, or None if it isn't a two-outcome game."""
+    outcomes, prices = match.outcomes, match.outcome_prices
+    if len(outcomes) != 2 or len(prices) != 2:
+        return None
+    return {
+        'slug': match.slug,
+        'title': match.question or '',
+        'home_team': outcomes[0],
+        'away_team': outcomes[1],
+        'home_price': Decimal(str(prices[0])),
+        'away_price': Decimal(str(prices[1])),
+        'token_ids': list(match.token_ids) or None,
+        'last_updated': scan_start_time,
+        'league': league,
+    }
+
+def build_scan_rows(resolved_events, scan_start_time):
+    """
+    Turns the network stage output into plain row dicts for each table.
+    Each event contributes one Polymarket row and its team markets are paired
+    against it; pair rows reference markets by ticker/slug until ids exist.
+    Profit and direction for every pair are then computed in a single batch.
+    """
+    kalshi_rows, poly_rows, pair_rows = {}, {}, []
+    pair_prices, pair_teams = [], []
+    for event_ticker, k_markets, match in resolved_events:
+        # Always store the Kalshi market rows
+        for k_market in k_markets:
+            kalshi_rows[k_market.ticker] = _kalshi_row(k_market, scan_start_time)
+
+        if not match or not match.slug:
             continue
-        data = resp.json()
-        outcomes = json.loads(data["outcomes"]) if isinstance(data["outcomes"], str) else data["outcomes"]
-        prices = json.loads(data["outcomePrices"]) if isinstance(data["outcomePrices"], str) else data["outcomePrices"]
-        if len(outcomes) != 2:
+        league = kalshi_rows[k_markets[0].ticker]['league']
+        poly_row = _polymarket_row(match, league, scan_start_time)
+        if poly_row is None:
             continue
-        home_team, away_team = outcomes[0], outcomes[1]
-        home_price, away_price = Decimal(str(prices[0])), Decimal(str(prices[1]))
-        # Insert or update PolymarketMarket row
-        poly_market_stmt = insert(PolymarketMarket).values(
-            slug=match['slug'], title=match.get('question', ''), home_team=home_team, away_team=away_team,
-            home_price=home_price, away_price=away_price, last_updated=scan_start_time, league=league
-        ).on_conflict_do_update(
-            index_elements=[PolymarketMarket.slug],
-            set_={
-                'title': match.get('question', ''),
-                'home_team': home_team,
-                'away_team': away_team,
-                'home_price': home_price,
-                'away_price': away_price,
+        poly_rows[poly_row['slug']] = poly_row
+
+        match_score = Decimal(str(match.match_score))
+        for k_market in k_markets:
+            kalshi_row = kalshi_rows[k_market.ticker]
+            team_code = kalshi_row['team']
+            # Pair the specific Kalshi team to the correct Polymarket outcome
+            if is_same_team(team_code, poly_row['home_team'], league):
+                team_outcome = 0
+            elif is_same_team(team_code, poly_row['away_team'], league):
+                team_outcome = 1
+            elif match_score < 1:
+                # Fuzzy matches are mostly teams the dictionary doesn't know
+                team_outcome = outcome_index(k_market, (poly_row['home_team'], poly_row['away_team']))
+            else:
+                team_outcome = None
+            if team_outcome is None:
+                continue  # No valid outcome mapping
+            pair_rows.append({
+                'kalshi_ticker': kalshi_row['ticker'],
+                'slug': poly_row['slug'],
+                'league': league,
+                'match_score': match_score,
                 'last_updated': scan_start_time,
-                'league': league
-            }
-        )
-        db.execute(poly_market_stmt)
-        db.commit()
-        poly_market = db.query(PolymarketMarket).filter_by(slug=match['slug']).one()
-
-        # Now, pair the specific Kalshi team to the correct Polymarket outcome
-        poly_team_outcome = None
-        poly_opponent_outcome = None
-        price_yes = None
-        price_no = None
-
-
-        # Find which outcome matches this Kalshi team
-        for i, outcome in enumerate([home_team, away_team]):
-            if is_same_team(team_code, outcome, league):
-                poly_team_outcome = outcome
-                # price_yes = [home_price, away_price][i]
-                # price_no = [away_price, home_price][i] # Not useful for now
-                break
-
-        
-        if poly_team_outcome is None:
-            continue  # No valid outcome mapping
-        # Arbitrage calculation as before
-        arbs = detect_arbitrage(kalshi_market, poly_market, Decimal('0.0'))
-        if arbs:
-            best_arb = max(arbs, key=lambda x: x['profit'])
-            profit = Decimal(str(best_arb['profit']))
-            direction = best_arb['type']
-        else:
-            profit = 0
-            direction = None
-        map_stmt = insert(MarketMatchMap).values(
-            kalshi_market_id=kalshi_market.id,
-            polymarket_market_id=poly_market.id,
-            league=league,
-            profit=profit,
-            direction=direction,
-            last_updated=scan_start_time
-        ).on_conflict_do_update(
-            index_elements=[MarketMatchMap.kalshi_market_id, MarketMatchMap.polymarket_market_id],
-            set_={'league': league,
-                  'profit': profit,
-                  'direction': direction,
-                  'last_updated': scan_start_time}
-        )
-        db.execute(map_stmt)
+                # Index of the Kalshi team among the Polymarket outcomes; live ticks reprice with it
+                'team_outcome': team_outcome,
+            })
+            pair_prices.append(aligned_prices(kalshi_row, poly_row, team_outcome))
+            pair_teams.append(team_code)
+
+    # Price every pair of the scan in one vectorized pass
+    with span('arbitrage', pairs=len(pair_rows)):
+        _price_pairs(pair_rows, pair_prices, pair_teams)
+    return kalshi_rows, poly_rows, pair_rows
+
+def _price_pairs(pair_rows, pair_prices, pair_teams):
+    price_pair_rows(pair_rows, pair_prices, pair_teams)
+    for pair in pair_rows:
+        pair.update(executable_fields(None if pair['direction'] else EMPTY_SWEEP))
+
+async def attach_executable_depth(poly_rows, pair_rows, store=order_books, concurrency=SCAN_CONCURRENCY):
+    """
+    Depth stage of a scan: fetches order books only for pairs whose top of book
+    is profitable (every other pair executes zero contracts by definition) and
+    sets each such pair's executable size, profit and profit curve.
+    """
+    profitable = [pair for pair in pair_rows if pair['direction']]
+    if not profitable:
+        return
+    tickers = {pair['kalshi_ticker'] for pair in profitable}
+    token_ids = {t for pair in profitable for t in poly_rows[pair['slug']].get('token_ids') or ()}
+    async with async_client(concurrency, HTTP_TIMEOUT_SECONDS, wrap=InstrumentedTransport) as client:
+        await store.fetch(client, tickers, token_ids, asyncio.Semaphore(concurrency))
+    for pair in profitable:
+        pair.update(executable_fields(store.executable(pair, poly_rows[pair['slug']])))
+
+def _delete_unseen(db: Session, model, key_column, seen, leagues, returning):
+    """DELETE .. WHERE key <> ALL(seen) [AND league IN leagues] RETURNING; one statement however many keys."""
+    stmt = delete(model).where(key_column != all_(bindparam('seen', list(seen), type_=ARRAY(key_column.type))))
+    if leagues is not None:
+        stmt = stmt.where(model.league.in_(leagues))
+    return db.execute(stmt.returning(*returning)).all()
+
+def _change_rows(kind, op, changes, league_of, scan_start_time):
+    return [{'changed_at': scan_start_time, 'league': league_of.get(key), 'kind': kind, 'key': key, 'op': op,
+             'fields': fields} for key, fields in changes.items()]
+
+def write_scan_rows(db: Session, kalshi_rows, poly_rows, pair_rows, scan_start_time, leagues=None, state=sync_state):
+    """
+    Writes a scan in a single transaction, touching only what changed:
+      - rows whose tracked fields differ from what this process last wrote
+        (see SyncState) are upserted; unchanged rows are not rewritten at all;
+      - rows of the scanned `leagues` (all when None) that the scan did not see
+        are deleted, so a league shard never deletes another shard's markets;
+      - every upsert/delete is appended to price_changes with just the changed
+        fields, and each league's scan_generations row records the pass.
+    Liveness is therefore the league's scan generation, not a last_updated
+    bumped on every row; last_updated is the last scan that changed the row.
+    """
+    pairs = {pair['kalshi_ticker']: pair for pair in pair_rows}
+    changed = {kind: state.changes(kind, rows) for kind, rows in
+               (('kalshi', kalshi_rows), ('polymarket', poly_rows), ('pair', pairs))}
+    try:
+        kalshi_ids = state.ids('kalshi')
+        written_kalshi = dict(_bulk_upsert(db, KalshiMarket, [kalshi_rows[t] for t in changed['kalshi']], ['ticker'],
+                                           returning=(KalshiMarket.ticker, KalshiMarket.id)))
+        kalshi_ids.update(written_kalshi)
+        poly_ids = state.ids('polymarket')
+        written_poly = dict(_bulk_upsert(db, PolymarketMarket, [poly_rows[s] for s in changed['polymarket']], ['slug'],
+                                         returning=(PolymarketMarket.slug, PolymarketMarket.id)))
+        poly_ids.update(written_poly)
+
+        map_rows = [{
+            'kalshi_market_id': kalshi_ids[pair['kalshi_ticker']],
+            'polymarket_market_id': poly_ids[pair['slug']],
+            'league': pair['league'],
+            'profit': pair['profit'],
+            'direction': pair['direction'],
+            'match_score': pair['match_score'],
+            'team_outcome': pair['team_outcome'],
+            'executable_size': pair['executable_size'],
+            'executable_profit': pair['executable_profit'],
+            'profit_curve': pair['profit_curve'],
+            'last_updated': pair['last_updated'],
+        } for pair in (pairs[t] for t in changed['pair'])]
+        # One map row per Kalshi market: a re-match to another slug overwrites polymarket_market_id in place
+        _bulk_upsert(db, MarketMatchMap, map_rows, ['kalshi_market_id'])
+
+        removed_map = _delete_unseen(db, MarketMatchMap, MarketMatchMap.kalshi_market_id,
+                                     [kalshi_ids[t] for t in pairs], leagues,
+                                     (MarketMatchMap.kalshi_market_id, MarketMatchMap.league))
+        removed_kalshi = _delete_unseen(db, KalshiMarket, KalshiMarket.ticker, kalshi_rows, leagues,
+                                        (KalshiMarket.ticker, KalshiMarket.id, KalshiMarket.league))
+        removed_poly = {slug: league for slug, league in
+                        _delete_unseen(db, PolymarketMarket, PolymarketMarket.slug, poly_rows, leagues,
+                                       (PolymarketMarket.slug, PolymarketMarket.league))}
+        tickers_by_id = {i: t for t, i in kalshi_ids.items()}
+        tickers_by_id.update((i, t) for t, i, _ in removed_kalshi)
+        removed_pairs = {tickers_by_id[i]: league for i, league in removed_map if i in tickers_by_id}
+        removed_kalshi = {t: league for t, _, league in removed_kalshi}
+
+        log = (_change_rows('kalshi', 'upsert', changed['kalshi'],
+                            {t: r['league'] for t, r in kalshi_rows.items()}, scan_start_time)
+               + _change_rows('polymarket', 'upsert', changed['polymarket'],
+                              {s: r['league'] for s, r in poly_rows.items()}, scan_start_time)
+               + _change_rows('pair', 'upsert', changed['pair'],
+                              {t: p['league'] for t, p in pairs.items()}, scan_start_time)
+               + _change_rows('kalshi', 'delete', dict.fromkeys(removed_kalshi), removed_kalshi, scan_start_time)
+               + _change_rows('polymarket', 'delete', dict.fromkeys(removed_poly), removed_poly, scan_start_time)
+               + _change_rows('pair', 'delete', dict.fromkeys(removed_pairs), removed_pairs, scan_start_time))
+        if log:
+            db.execute(insert(PriceChange), log)
+        db.query(PriceChange).filter(
+            PriceChange.changed_at < scan_start_time - timedelta(hours=CHANGE_LOG_RETENTION_HOURS)
+        ).delete(synchronize_session=False)
+
+        changed_by_league = Counter(row['league'] for row in log)
+        generations = [{'league': league, 'generation': 1, 'scanned_at': scan_start_time,
+                        'changed_rows': changed_by_league[league]} for league in (leagues or LEAGUES)]
+        stmt = insert(ScanGeneration).values(generations)
+        db.execute(stmt.on_conflict_do_update(index_elements=['league'], set_={
+            'generation': ScanGeneration.generation + 1,
+            'scanned_at': stmt.excluded.scanned_at,
+            'changed_rows': stmt.excluded.changed_rows,
+        }))
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    state.commit('kalshi', kalshi_rows, written_kalshi, written_kalshi, removed_kalshi)
+    state.commit('polymarket', poly_rows, written_poly, written_poly, removed_poly)
+    state.commit('pair', pairs, changed['pair'], removed=removed_pairs)
+
+class ScanResult(NamedTuple):
+    scan_start_time: datetime
+    leagues: tuple     # League shards this scan covered
+    kalshi_rows: dict  # ticker -> KalshiMarket row
+    poly_rows: dict    # slug -> PolymarketMarket row
+    pair_rows: list    # MarketMatchMap rows keyed by kalshi_ticker/slug
 
-    
-    db.query(MarketMatchMap).filter(MarketMatchMap.last_updated < scan_start_time).delete()
-    db.query(KalshiMarket).filter(KalshiMarket.last_updated < scan_start_time).delete()
-    db.query(PolymarketMarket).filter(PolymarketMarket.last_updated < scan_start_time).delete()
-    db.commit()
-    print("Filtering complete! Remaining matched markets:", db.query(MarketMatchMap).count())
\ No newline at end of file
+def fetch_and_sync_and_calculate_profit(db: Session, leagues=None) -> ScanResult:
+    """
+    Runs one scan of the given league shards (every league when None), writes it
+    to the database and returns the rows it wrote.
+    """
+    leagues = tuple(leagues or LEAGUES)
+    catalog = PolymarketCatalog(leagues) if POLYMARKET_CATALOG_ENABLED else None
+    matcher = MarketMatcher(cache=slug_cache, catalog=catalog)
+    scan_start_time = datetime.now()
+    logger.info("Scan of %s started at %s", ','.join(leagues), scan_start_time)
+    with span('scan_total'):
+        with span('slug_cache_load'):
+            slug_cache.load(db)
+        with span('fetch'):
+            resolved_events = asyncio.run(fetch_scan_inputs(matcher, series_for(leagues)))
+        with span('build_rows'):
+            kalshi_rows, poly_rows, pair_rows = build_scan_rows(resolved_events, scan_start_time)
+        if ORDER_BOOK_DEPTH_ENABLED:
+            with span('order_book_depth'):
+                asyncio.run(attach_executable_depth(poly_rows, pair_rows))
+        with span('db_write', kalshi=len(kalshi_rows), polymarket=len(poly_rows), pairs=len(pair_rows)):
+            write_scan_rows(db, kalshi_rows, poly_rows, pair_rows, scan_start_time, leagues)
+        if OPPORTUNITIES_TABLE_ENABLED:
+            # The scan is committed by now; a failed read-model publish only leaves the previous generation up
+            try:
+                with span('publish_opportunities'):
+                    publish_opportunities(db, kalshi_rows, poly_rows, pair_rows, leagues)
+            except Exception:
+                metrics.OPPORTUNITY_PUBLISHES.inc(result='error')
+                logger.exception("Publishing opportunities of %s failed", ','.join(leagues))
+            else:
+                metrics.OPPORTUNITY_PUBLISHES.inc(result='ok')
+        with span('slug_cache_flush'):
+            slug_cache.flush(db)
+    matched = len({pair['kalshi_ticker'] for pair in pair_rows})
+    metrics.SCAN_MARKETS.inc(matched, outcome='matched')
+    metrics.SCAN_MARKETS.inc(len(kalshi_rows) - matched, outcome='unmatched')
+    logger.info("Sync complete! Matched markets this scan: %d", len(pair_rows))
+    return ScanResult(scan_start_time, leagues, kalshi_rows, poly_rows, pair_rows)
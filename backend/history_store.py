@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from config import HISTORY_DIR, HISTORY_FLUSH_ROWS, HISTORY_FLUSH_SECONDS
+
+# One raw little-endian file per column per partition; row i of a partition is element i of every column
+COLUMNS = {
+    'ts': np.dtype('<i8'),               # Observation time, epoch microseconds
+    'ticker': np.dtype('<i4'),           # Kalshi ticker, id into the partition's tickers.txt
+    'league': np.dtype('<i4'),           # League, id into the partition's leagues.txt
+    'source': np.dtype('i1'),            # SCAN or LIVE
+    'kalshi_yes': np.dtype('<f8'),       # NaN when unknown
+    'kalshi_no': np.dtype('<f8'),
+    'poly_yes': np.dtype('<f8'),         # Polymarket price of the Kalshi team's outcome; NaN when unmatched
+    'poly_no': np.dtype('<f8'),
+    'profit': np.dtype('<f8'),
+    'direction': np.dtype('i1'),         # lib.arbitrage_engine NO_ARB / YES_KALSHI / YES_POLY
+    'executable_size': np.dtype('<f8'),
+}
+SOURCES = ('scan', 'live')
+SCAN, LIVE = 0, 1
+PARTITION_FORMAT = '%Y%m%d%H'  # One directory per hour
+
+def _direction_code(direction: Optional[str]) -> int:
+    if not direction:
+        return 0
+    return 1 if direction.startswith('YES_Kalshi') else 2
+
+def _local(ts: datetime) -> datetime:
+    """Partitions are named in naive local time; aware datetimes are converted to it."""
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+def _float(value) -> float:
+    return float(value) if value is not None else np.nan
+
+class _Symbols:
+    """Append-only string dictionary of a partition, one value per line; the id is the line number."""
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    self.ids.setdefault(line.rstrip('\n'), len(self.ids))
+
+    def id_for(self, value: str, pending: list) -> int:
+        if value not in self.ids:
+            self.ids[value] = len(self.ids)
+            pending.append(value)
+        return self.ids[value]
+
+    def values(self) -> list:
+        by_id = [None] * len(self.ids)
+        for value, i in self.ids.items():
+            by_id[i] = value
+        return by_id
+
+class HistoryStore:
+    """
+    Append-only, hour-partitioned columnar history of every observed price and
+    opportunity, kept on local disk instead of the hot Postgres tables.
+
+    Rows are buffered and appended to per-column files in batches; symbols are
+    appended before the columns that reference them, and readers take the
+    shortest column as the row count, so a reader never sees a half-written row;
+    writers truncate the columns to that count before appending, so a batch a
+    crash left half-written can't shift later rows out of line.
+    Queries prune partitions by time window and by whether the ticker appears
+    in the partition, then filter the memory-mapped columns with numpy.
+    """
+    def __init__(self, root: str = HISTORY_DIR, flush_rows: int = HISTORY_FLUSH_ROWS,
+                 flush_seconds: float = HISTORY_FLUSH_SECONDS):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._buffer = []  # (partition, ticker, league, column values...)
+        self._last_flush = time.monotonic()
+        self._symbols = {}  # (partition, 'tickers'|'leagues') -> _Symbols
+
+    def record_scan(self, kalshi_rows: dict, poly_rows: dict, pair_rows: list):
+        """Records every Kalshi market of a scan, with its pair's Polymarket prices and profit when matched."""
+        pairs = {pair['kalshi_ticker']: pair for pair in pair_rows}
+        self._append([(k, poly_rows.get(pairs[t]['slug']) if t in pairs else None, pairs.get(t))
+                      for t, k in kalshi_rows.items()], SCAN)
+
+    def record_live(self, observations: list):
+        """Records live repricings as (kalshi_row, poly_row, pair) triples."""
+        self._append(observations, LIVE)
+
+    def _append(self, observations, source: int):
+        rows = []
+        for k, p, pair in observations:
+            ts = (pair or k)['last_updated']
+            poly_yes = poly_no = np.nan
+            if p is not None and pair is not None and pair.get('team_outcome') is not None:
+                prices = (_float(p['home_price']), _float(p['away_price']))
+                poly_yes, poly_no = prices[pair['team_outcome']], prices[1 - pair['team_outcome']]
+            rows.append((_local(ts).strftime(PARTITION_FORMAT), k['ticker'], k.get('league') or '', (
+                int(ts.timestamp() * 1_000_000), source,
+                _float(k['yes_ask_dollars']), _float(k['no_ask_dollars']), poly_yes, poly_no,
+                _float(pair['profit']) if pair else np.nan,
+                _direction_code(pair['direction']) if pair else 0,
+                _float(pair.get('executable_size')) if pair else np.nan,
+            )))
+        with self._lock:
+            self._buffer.extend(rows)
+            due = (len(self._buffer) >= self.flush_rows
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            by_partition = {}
+            for row in buffer:
+                by_partition.setdefault(row[0], []).append(row)
+            for partition, rows in by_partition.items():
+                self._write_partition(partition, rows)
+            # Only the current hour is written to; forget older partitions' dictionaries
+            if by_partition:
+                self._symbols = {key: s for key, s in self._symbols.items() if key[0] in by_partition}
+
+    def _write_partition(self, partition: str, rows: list):
+        directory = os.path.join(self.root, partition)
+        os.makedirs(directory, exist_ok=True)
+        ids = {}
+        for kind, position in (('tickers', 1), ('leagues', 2)):
+            symbols = self._symbols.get((partition, kind))
+            if symbols is None:
+                symbols = self._symbols[(partition, kind)] = _Symbols(os.path.join(directory, f'{kind}.txt'))
+            pending = []
+            ids[kind] = [symbols.id_for(row[position], pending) for row in rows]
+            if pending:
+                with open(symbols.path, 'a') as f:
+                    f.write(''.join(f'{value}\n' for value in pending))
+        self._align(directory)
+        values = list(zip(*(row[3] for row in rows)))
+        columns = {'ticker': ids['tickers'], 'league': ids['leagues'],
+                   **dict(zip(('ts', 'source', 'kalshi_yes', 'kalshi_no', 'poly_yes', 'poly_no', 'profit',
+                               'direction', 'executable_size'), values))}
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(directory, f'{name}.bin'), 'ab') as f:
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+
+    @staticmethod
+    def _align(directory: str):
+        """Truncates every column file to the rows all columns have, dropping a batch a crash left half-written."""
+        paths = {name: os.path.join(directory, f'{name}.bin') for name in COLUMNS}
+        sizes = {name: os.path.getsize(path) // COLUMNS[name].itemsize if os.path.exists(path) else 0
+                 for name, path in paths.items()}
+        length = min(sizes.values())
+        for name, path in paths.items():
+            if os.path.exists(path) and os.path.getsize(path) != length * COLUMNS[name].itemsize:
+                os.truncate(path, length * COLUMNS[name].itemsize)
+
+    def partitions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        """Partition names overlapping [start, end], oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        low = _local(start).strftime(PARTITION_FORMAT) if start else None
+        high = _local(end).strftime(PARTITION_FORMAT) if end else None
+        return sorted(p for p in os.listdir(self.root)
+                      if p.isdigit() and (low is None or p >= low) and (high is None or p <= high))
+
+    def query(self, ticker: Optional[str] = None, league: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None,
+              min_profit: Optional[float] = None, limit: int = 1000) -> list:
+        """
+        Observations matching every given filter in [start, end), oldest first,
+        at most `limit` of them (the earliest ones).
+        """
+        self.flush()
+        start_us = int(start.timestamp() * 1_000_000) if start else None
+        end_us = int(end.timestamp() * 1_000_000) if end else None
+        results = []
+        for partition in self.partitions(start, end):
+            directory = os.path.join(self.root, partition)
+            tickers = _Symbols(os.path.join(directory, 'tickers.txt'))
+            leagues = _Symbols(os.path.join(directory, 'leagues.txt'))
+            if (ticker is not None and ticker not in tickers.ids) or (league is not None and league not in leagues.ids):
+                continue
+            columns = self._map(directory)
+            if columns is None:
+                continue
+            mask = np.ones(len(columns['ts']), dtype=bool)
+            if ticker is not None:
+                mask &= columns['ticker'] == tickers.ids[ticker]
+            if league is not None:
+                mask &= columns['league'] == leagues.ids[league]
+            if start_us is not None:
+                mask &= columns['ts'] >= start_us
+            if end_us is not None:
+                mask &= columns['ts'] < end_us
+            if min_profit is not None:
+                mask &= columns['profit'] > min_profit
+            rows = np.flatnonzero(mask)
+            # Scans and live ticks interleave, so rows are only roughly time ordered within a partition
+            rows = rows[np.argsort(columns['ts'][rows], kind='stable')][:limit - len(results)]
+            ticker_names, league_names = tickers.values(), leagues.values()
+            for i in rows:
+                results.append(self._record(columns, i, ticker_names, league_names))
+            if len(results) >= limit:
+                break
+        return results
+
+    def _map(self, directory: str):
+        """Memory-maps every column of a partition, truncated to the rows all columns have."""
+        sizes = {}
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f'{name}.bin')
+            sizes[name] = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        length = min(sizes.values())
+        if length == 0:
+            return None
+        return {name: np.memmap(os.path.join(directory, f'{name}.bin'), dtype=dtype, mode='r', shape=(length,))
+                for name, dtype in COLUMNS.items()}
+
+    @staticmethod
+    def _record(columns, i, ticker_names, league_names) -> dict:
+        def value(name):
+            v = float(columns[name][i])
+            return None if np.isnan(v) else v
+        direction = int(columns['direction'][i])
+        return {
+            "ts": datetime.fromtimestamp(int(columns['ts'][i]) / 1_000_000),
+            "kalshi_ticker": ticker_names[columns['ticker'][i]],
+            "league": league_names[columns['league'][i]] or None,
+            "source": SOURCES[columns['source'][i]],
+            "kalshi_yes_ask": value('kalshi_yes'),
+            "kalshi_no_ask": value('kalshi_no'),
+            "poly_yes": value('poly_yes'),
+            "poly_no": value('poly_no'),
+            "profit": value('profit'),
+            "direction": ('YES_Kalshi + NO_Poly', 'YES_Poly + NO_Kalshi')[direction - 1] if direction else None,
+            "executable_size": value('executable_size'),
+        }
+
+history_store = HistoryStore()
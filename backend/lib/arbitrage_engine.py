@@ -0,0 +1,97 @@
+import numpy as np
+from decimal import Decimal
+from typing import NamedTuple
+
+# Prices are held as int64 multiples of 1e-9 dollars. Kalshi quotes 4 decimals and
+# Gamma at most a handful, so the conversion is exact and integer sums/differences
+# reproduce the Decimal arithmetic in arbitrage_utils.detect_arbitrage bit for bit.
+PRICE_SCALE = 10**9
+MISSING = -1  # Prices are never negative, so -1 marks "no quote"
+
+# Values of BatchResult.best
+NO_ARB, YES_KALSHI, YES_POLY = 0, 1, 2
+
+class BatchResult(NamedTuple):
+    yes_kalshi_cost: np.ndarray    # kalshi_yes + pm_no, nan where a price is missing
+    yes_poly_cost: np.ndarray      # pm_yes + kalshi_no, nan where a price is missing
+    yes_kalshi_profit: np.ndarray  # 1 - (kalshi_yes + pm_no), nan where a price is missing
+    yes_poly_profit: np.ndarray    # 1 - (pm_yes + kalshi_no), nan where a price is missing
+    best: np.ndarray               # NO_ARB / YES_KALSHI / YES_POLY per pair
+    best_profit: np.ndarray        # Profit of `best`, 0 where NO_ARB
+    best_cost: np.ndarray          # Cost of `best`, nan where NO_ARB
+
+def to_units(values) -> np.ndarray:
+    """Converts Decimal/str/float prices (None allowed) to an int64 array of PRICE_SCALE units."""
+    out = np.empty(len(values), dtype=np.int64)
+    for i, v in enumerate(values):
+        out[i] = MISSING if v is None else int((Decimal(str(v)) * PRICE_SCALE).to_integral_value())
+    return out
+
+def threshold_units(min_profit) -> int:
+    # For integer x, x > r  <=>  x > floor(r), so any min_profit precision is honoured
+    return int((Decimal(str(min_profit)) * PRICE_SCALE).to_integral_value(rounding='ROUND_FLOOR'))
+
+def detect_arbitrage_batch(kalshi_yes, kalshi_no, pm_yes, pm_no, min_profit=0) -> BatchResult:
+    """
+    Vectorized detect_arbitrage over aligned int64 unit arrays (see to_units), one
+    element per Kalshi <-> Polymarket pair:
+      - YES Kalshi + NO Poly  costs kalshi_yes + pm_no
+      - YES Poly + NO Kalshi  costs pm_yes + kalshi_no
+    pm_yes/pm_no must already be aligned to the Kalshi team. Ties between the two
+    directions go to YES Kalshi, matching max() over the scalar function's list.
+    """
+    one = PRICE_SCALE
+    min_units = threshold_units(min_profit)
+
+    valid_yk = (kalshi_yes != MISSING) & (pm_no != MISSING)
+    valid_yp = (pm_yes != MISSING) & (kalshi_no != MISSING)
+    cost_yk = kalshi_yes + pm_no
+    cost_yp = pm_yes + kalshi_no
+    profit_yk = one - cost_yk
+    profit_yp = one - cost_yp
+
+    arb_yk = valid_yk & (profit_yk > min_units)
+    arb_yp = valid_yp & (profit_yp > min_units)
+    pick_yk = arb_yk & (~arb_yp | (profit_yk >= profit_yp))
+    pick_yp = arb_yp & ~pick_yk
+
+    best = np.full(len(cost_yk), NO_ARB, dtype=np.int8)
+    best[pick_yk] = YES_KALSHI
+    best[pick_yp] = YES_POLY
+    best_profit = np.where(pick_yk, profit_yk, np.where(pick_yp, profit_yp, 0)) / one
+    best_cost = np.where(pick_yk, cost_yk / one, np.where(pick_yp, cost_yp / one, np.nan))
+
+    return BatchResult(
+        yes_kalshi_cost=np.where(valid_yk, cost_yk / one, np.nan),
+        yes_poly_cost=np.where(valid_yp, cost_yp / one, np.nan),
+        yes_kalshi_profit=np.where(valid_yk, profit_yk / one, np.nan),
+        yes_poly_profit=np.where(valid_yp, profit_yp / one, np.nan),
+        best=best,
+        best_profit=best_profit,
+        best_cost=best_cost,
+    )
+
+def direction_label(best: int, team: str):
+    """The `type` string detect_arbitrage uses for a direction, or None for NO_ARB."""
+    if best == YES_KALSHI:
+        return f'YES_Kalshi_{team} + NO_Poly_{team}'
+    if best == YES_POLY:
+        return f'YES_Poly_{team} + NO_Kalshi_{team}'
+    return None
+
+def aligned_prices(kalshi_row: dict, poly_row: dict, team_outcome: int) -> tuple:
+    """(kalshi_yes, kalshi_no, pm_yes, pm_no) of a pair, the Polymarket legs read from the Kalshi team's outcome."""
+    pm_yes, pm_no = ((poly_row['home_price'], poly_row['away_price']) if team_outcome == 0
+                     else (poly_row['away_price'], poly_row['home_price']))
+    return kalshi_row['yes_ask_dollars'], kalshi_row['no_ask_dollars'], pm_yes, pm_no
+
+def price_pair_rows(pair_rows: list, pair_prices: list, pair_teams: list, min_profit=0):
+    """Sets 'profit' and 'direction' on every pair row from one batch over their aligned_prices."""
+    if not pair_rows:
+        return
+    kalshi_yes, kalshi_no, pm_yes, pm_no = (to_units(col) for col in zip(*pair_prices))
+    result = detect_arbitrage_batch(kalshi_yes, kalshi_no, pm_yes, pm_no, min_profit)
+    for i, pair in enumerate(pair_rows):
+        direction = direction_label(result.best[i], pair_teams[i])
+        pair['profit'] = Decimal(str(float(result.best_profit[i]))) if direction else 0
+        pair['direction'] = direction
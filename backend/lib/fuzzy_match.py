@@ -0,0 +1,167 @@
+"""
+Blocked fuzzy matcher for Kalshi markets whose tickers don't yield a Polymarket slug.
+
+Polymarket game markets are grouped into blocks by (league, game date) and,
+within each block, indexed by title/outcome word tokens and character
+trigrams. A Kalshi market only probes the blocks of its own league within a
+day either side of its date (time zones shift dates), gathers the candidates
+sharing the most index keys and scores just those, so matching stays close to
+linear in the number of markets instead of N x M.
+
+The score is a confidence in [0, 1]: the mean of the token and trigram Jaccard
+similarities between the two titles (Polymarket outcomes included), docked
+DATE_PENALTY per day the dates differ so a rematch a day apart loses to the
+same-day game.
+"""
+import os
+import re
+from collections import Counter
+from datetime import date, timedelta
+from typing import Optional
+from lib.team_resolver import MONTHS, parse_ticker
+
+FUZZY_MATCH_MIN_SCORE = float(os.getenv('FUZZY_MATCH_MIN_SCORE', '0.6'))
+CANDIDATES_PER_MARKET = 20  # Best candidates by shared index keys that get fully scored
+DATE_SLACK_DAYS = 1
+DATE_PENALTY = 0.1  # Confidence lost per day between the two markets' dates
+
+# Words that appear in nearly every game title and say nothing about which game it is
+STOPWORDS = frozenset({'at', 'vs', 'v', 'the', 'winner', 'win', 'will', 'game', 'match', 'beat', 'who', 'wins'})
+# Outcome sets of non-moneyline markets listed under the same events
+_NON_TEAM_OUTCOMES = frozenset({'yes', 'no', 'over', 'under'})
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_SLUG_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})$')
+_EVENT_DATE_RE = re.compile(r'^(\d{2})([A-Z]{3})(\d{2})')
+
+def tokens(text: str) -> frozenset:
+    return frozenset(w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS)
+
+def trigrams(words) -> frozenset:
+    grams = set()
+    for word in words:
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def similarity(a_tokens, a_grams, b_tokens, b_grams) -> float:
+    return (_jaccard(a_tokens, b_tokens) + _jaccard(a_grams, b_grams)) / 2
+
+def _iso_date(value) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+def polymarket_date(market) -> Optional[date]:
+    """Game date from the slug suffix (nba-bkn-phi-2025-12-23), else the start/end timestamps."""
+    found = _SLUG_DATE_RE.search(market.slug or '')
+    return _iso_date(found.group(1) if found else market.game_start_time or market.end_date)
+
+def kalshi_league(ticker: str) -> Optional[str]:
+    """'NBA' for KXNBAGAME-...; for unknown series the part between KX and GAME (KXEPLGAME -> EPL)."""
+    info = parse_ticker(ticker)
+    if info:
+        return info.league
+    series = ticker.upper().split('-')[0]
+    series = series[2:] if series.startswith('KX') else series
+    return series[:-4] if series.endswith('GAME') else series or None
+
+def kalshi_date(market) -> Optional[date]:
+    ticker = market.ticker
+    info = parse_ticker(ticker)
+    if info:
+        return date.fromisoformat(info.date)
+    parts = ticker.upper().split('-')
+    found = _EVENT_DATE_RE.match(parts[1]) if len(parts) > 1 else None
+    if found and found.group(2) in MONTHS:
+        yr, mon, day = found.groups()
+        return _iso_date(f"20{yr}-{MONTHS[mon]}-{day}")
+    return _iso_date(market.expected_expiration_time or market.close_time)
+
+def kalshi_text(market) -> str:
+    """The game's title ("Nets at 76ers Winner?"); which side the market is on doesn't identify the game."""
+    return market.title or ''
+
+class _Candidate:
+    __slots__ = ('market', 'date', 'tokens', 'grams')
+
+    def __init__(self, market, game_date: date, text: str):
+        self.market = market
+        self.date = game_date
+        self.tokens = tokens(text)
+        self.grams = trigrams(self.tokens)
+
+class FuzzyMatchIndex:
+    """
+    Inverted index over Polymarket game markets (PolymarketMarketRecords),
+    blocked by (league, date).
+    `league_of(market)` gives a market's league (case-insensitive); markets
+    without a league or date, or whose outcomes aren't two teams, are skipped.
+    """
+    def __init__(self, markets, league_of, min_score: float = FUZZY_MATCH_MIN_SCORE):
+        self.min_score = min_score
+        self._candidates = []
+        self._postings = {}  # (league, date) -> {token or trigram: [candidate index]}
+        for market in markets:
+            outcomes = market.outcomes
+            league, game_date = league_of(market), polymarket_date(market)
+            if len(outcomes) != 2 or not league or not game_date:
+                continue
+            if {o.lower() for o in outcomes} & _NON_TEAM_OUTCOMES:
+                continue
+            if market.market_type not in (None, 'moneyline'):
+                continue
+            candidate = _Candidate(market, game_date, ' '.join([market.question or '', *outcomes]))
+            position = len(self._candidates)
+            self._candidates.append(candidate)
+            block = self._postings.setdefault((league.upper(), game_date), {})
+            for key in candidate.tokens | candidate.grams:
+                block.setdefault(key, []).append(position)
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def match(self, kalshi_market, date_slack: int = DATE_SLACK_DAYS):
+        """
+        (polymarket market, score) for the best candidate scoring at least
+        min_score within `date_slack` days of the Kalshi market's date, else None.
+        """
+        league, game_date = kalshi_league(kalshi_market.ticker), kalshi_date(kalshi_market)
+        if not league or not game_date:
+            return None
+        words = tokens(kalshi_text(kalshi_market))
+        grams = trigrams(words)
+        shared = Counter()
+        for offset in range(-date_slack, date_slack + 1):
+            block = self._postings.get((league, game_date + timedelta(days=offset)))
+            if not block:
+                continue
+            for key in words | grams:
+                shared.update(block.get(key, ()))
+        best, best_key = None, None
+        for position, _ in shared.most_common(CANDIDATES_PER_MARKET):
+            candidate = self._candidates[position]
+            days = abs((candidate.date - game_date).days)
+            score = similarity(words, grams, candidate.tokens, candidate.grams) * (1 - DATE_PENALTY * days)
+            # Equal titles a day apart (back-to-back series games): the exact date wins ties
+            key = (score, -days)
+            if score >= self.min_score and (best_key is None or key > best_key):
+                best, best_key = candidate, key
+        return (best.market, round(best_key[0], 4)) if best else None
+
+def outcome_index(kalshi_market, outcomes) -> Optional[int]:
+    """
+    Which of two Polymarket outcomes this Kalshi market's team is, when the
+    dictionary can't say: the outcome most similar to its yes_sub_title.
+    """
+    words = tokens(kalshi_market.yes_sub_title or '')
+    if not words:
+        return None
+    grams = trigrams(words)
+    scores = [similarity(words, grams, tokens(o), trigrams(tokens(o))) for o in outcomes]
+    best = max(range(len(scores)), key=scores.__getitem__)
+    # Both outcomes equally (un)like the team name: don't guess
+    return best if scores[best] > 0 and scores.count(scores[best]) == 1 else None
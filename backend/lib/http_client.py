@@ -0,0 +1,303 @@
+"""
+Shared client layer for all outbound exchange traffic.
+
+Every request goes through a transport that, on top of httpx's keep-alive
+connection pool:
+  - waits on a per-host token bucket (HTTP_HOST_RATE_LIMITS, requests/second),
+  - retries 429/5xx responses and transport errors with full-jitter exponential
+    backoff (honouring a numeric Retry-After),
+  - bounds each attempt by a hard deadline on top of httpx's per-phase timeouts
+    (async: cancelled at the deadline; sync: per-phase timeouts capped at the
+    deadline, and the body stops at the first chunk read after it),
+  - revalidates GETs it has seen before with If-None-Match, turning a 304 back
+    into the cached 200 so callers never see the difference.
+Rate limits and the ETag cache are process-wide, so every scan, shard and
+thread shares them. Async clients are per event loop (see async_client); sync
+callers share one pooled client (see get_client).
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+import httpx
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '10'))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', '5'))
+# Whole-attempt deadline (connect, wait for headers, read body); a trickling server can't outlast it
+HTTP_DEADLINE_SECONDS = float(os.getenv('HTTP_DEADLINE_SECONDS', '30'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv('HTTP_BACKOFF_BASE_SECONDS', '0.25'))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv('HTTP_BACKOFF_MAX_SECONDS', '8'))
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '32'))
+HTTP_ETAG_CACHE_ENTRIES = int(os.getenv('HTTP_ETAG_CACHE_ENTRIES', '10000'))
+# Total cached body bytes; a single body larger than HTTP_ETAG_MAX_BODY_BYTES is never cached
+HTTP_ETAG_CACHE_BYTES = int(os.getenv('HTTP_ETAG_CACHE_BYTES', str(64 * 1024 * 1024)))
+HTTP_ETAG_MAX_BODY_BYTES = int(os.getenv('HTTP_ETAG_MAX_BODY_BYTES', str(4 * 1024 * 1024)))
+# host -> sustained requests/second (the burst is one second's worth); unlisted hosts are not limited
+HTTP_HOST_RATE_LIMITS = json.loads(os.getenv('HTTP_HOST_RATE_LIMITS', json.dumps({
+    "api.elections.kalshi.com": 20,
+    "gamma-api.polymarket.com": 50,
+    "clob.polymarket.com": 50,
+})))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Accept": "application/json"}
+# Hop-by-hop / body-framing headers that don't describe a cached, already-decoded body
+_UNCACHED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+# retries, revalidated (304 served from cache), throttled (waited on a token bucket)
+stats = Counter()
+_stats_lock = threading.Lock()
+
+def _count(event: str):
+    with _stats_lock:
+        stats[event] += 1
+
+class TokenBucket:
+    """`rate` tokens/second up to `burst`. Thread-safe; callers sleep for the returned wait."""
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token (possibly going into debt) and returns how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class RateLimiter:
+    def __init__(self, limits: dict):
+        self._buckets = {host: TokenBucket(float(rate)) for host, rate in limits.items() if rate}
+
+    def reserve(self, host: str) -> float:
+        bucket = self._buckets.get(host)
+        wait = bucket.reserve() if bucket else 0.0
+        if wait:
+            _count('throttled')
+        return wait
+
+class ETagCache:
+    """
+    LRU of url -> (etag, headers, body) for GET responses that carried an ETag,
+    bounded by entry count and by total body bytes. Bodies over max_body_bytes
+    are not cached: large listing pages change between scans anyway.
+    """
+    def __init__(self, max_entries: int = HTTP_ETAG_CACHE_ENTRIES, max_bytes: int = HTTP_ETAG_CACHE_BYTES,
+                 max_body_bytes: int = HTTP_ETAG_MAX_BODY_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_body_bytes = min(max_body_bytes, max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, etag: str, headers, body: bytes):
+        headers = [(k, v) for k, v in headers.items() if k.lower() not in _UNCACHED_HEADERS]
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous:
+                self._bytes -= len(previous[2])
+            if len(body) > self.max_body_bytes:
+                return
+            self._entries[url] = (etag, headers, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+rate_limiter = RateLimiter(HTTP_HOST_RATE_LIMITS)
+etag_cache = ETagCache()
+
+def backoff_seconds(attempt: int, response: httpx.Response = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After (seconds form) when it sent one."""
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), HTTP_BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+class _Policy:
+    """The request/response bookkeeping shared by the sync and async transports."""
+    def __init__(self, transport, max_retries, limiter, cache):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.limiter = limiter
+        self.cache = cache
+
+    def _prepare(self, request: httpx.Request):
+        """Adds If-None-Match for a cached GET; returns the cache entry (or None)."""
+        entry = self.cache.get(str(request.url)) if request.method == 'GET' and self.cache else None
+        if entry:
+            request.headers['If-None-Match'] = entry[0]
+        return entry
+
+    def _finish(self, request: httpx.Request, response: httpx.Response, entry) -> httpx.Response:
+        if response.status_code == 304 and entry:
+            _count('revalidated')
+            return httpx.Response(200, headers=entry[1], content=entry[2], request=request,
+                                  extensions={**response.extensions, 'revalidated': True})
+        etag = response.headers.get('etag')
+        if etag and response.status_code == 200 and request.method == 'GET' and self.cache:
+            self.cache.put(str(request.url), etag, response.headers, response.content)
+        return response
+
+    def _should_retry(self, attempt: int, response: httpx.Response = None) -> bool:
+        if attempt >= self.max_retries or (response is not None and response.status_code not in RETRY_STATUSES):
+            return False
+        _count('retries')
+        return True
+
+class RetryingTransport(_Policy, httpx.AsyncBaseTransport):
+    """Async transport applying the rate limit, deadline, retries and ETag revalidation."""
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int = HTTP_MAX_RETRIES,
+                 deadline_seconds: float = HTTP_DEADLINE_SECONDS, limiter=rate_limiter, cache=etag_cache):
+        super().__init__(transport, max_retries, limiter, cache)
+        self.deadline_seconds = deadline_seconds
+
+    async def _attempt(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._prepare(request)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.limiter.reserve(request.url.host))
+            try:
+                response = await asyncio.wait_for(self._attempt(request), self.deadline_seconds)
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                if not self._should_retry(attempt):
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise httpx.TimeoutException(f"No response within {self.deadline_seconds}s",
+                                                     request=request) from e
+                    raise
+                await asyncio.sleep(backoff_seconds(attempt))
+            else:
+                if not self._should_retry(attempt, response):
+                    return self._finish(request, response, entry)
+                await asyncio.sleep(backoff_seconds(attempt, response))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+class _DeadlineStream(httpx.SyncByteStream):
+    """Response body that raises ReadTimeout once the attempt's deadline has passed, however steadily bytes trickle."""
+    def __init__(self, stream, request: httpx.Request, deadline: float, deadline_seconds: float):
+        self.stream = stream
+        self.request = request
+        self.deadline = deadline
+        self.deadline_seconds = deadline_seconds
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if time.monotonic() > self.deadline:
+                raise httpx.ReadTimeout(f"No response within {self.deadline_seconds}s", request=self.request)
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+
+class SyncRetryingTransport(_Policy, httpx.BaseTransport):
+    """
+    Blocking counterpart of RetryingTransport. A thread can't be cancelled, so
+    the deadline caps each per-phase timeout and is checked between body
+    chunks: an attempt ends at most one read timeout after it.
+    """
+    def __init__(self, transport: httpx.BaseTransport, max_retries: int = HTTP_MAX_RETRIES,
+                 deadline_seconds: float = HTTP_DEADLINE_SECONDS, limiter=rate_limiter, cache=etag_cache):
+        super().__init__(transport, max_retries, limiter, cache)
+        self.deadline_seconds = deadline_seconds
+
+    def _attempt(self, request: httpx.Request) -> httpx.Response:
+        deadline = time.monotonic() + self.deadline_seconds
+        timeouts = request.extensions.get('timeout') or {}
+        request.extensions['timeout'] = {phase: min(seconds, self.deadline_seconds) if seconds is not None
+                                         else self.deadline_seconds for phase, seconds in timeouts.items()}
+        response = self.transport.handle_request(request)
+        response.stream = _DeadlineStream(response.stream, request, deadline, self.deadline_seconds)
+        try:
+            response.read()
+        finally:
+            response.close()
+        return response
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._prepare(request)
+        attempt = 0
+        while True:
+            time.sleep(self.limiter.reserve(request.url.host))
+            try:
+                response = self._attempt(request)
+            except httpx.TransportError:
+                if not self._should_retry(attempt):
+                    raise
+                time.sleep(backoff_seconds(attempt))
+            else:
+                if not self._should_retry(attempt, response):
+                    return self._finish(request, response, entry)
+                time.sleep(backoff_seconds(attempt, response))
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+def _timeout(timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(timeout, connect=min(timeout, HTTP_CONNECT_TIMEOUT_SECONDS))
+
+def async_client(max_connections: int = HTTP_MAX_CONNECTIONS, timeout: float = HTTP_TIMEOUT_SECONDS,
+                 wrap=None) -> httpx.AsyncClient:
+    """
+    A pooled AsyncClient going through RetryingTransport. `wrap`, when given,
+    wraps the network transport underneath the policy (so e.g. an instrumenting
+    transport sees every attempt, 429s and 304s included). Open one per scan or
+    event loop and share it across that loop's requests.
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    network = httpx.AsyncHTTPTransport(limits=limits)
+    return httpx.AsyncClient(transport=RetryingTransport(wrap(network) if wrap else network),
+                             timeout=_timeout(timeout), headers=DEFAULT_HEADERS)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> httpx.Client:
+    """The process-wide blocking client (thread-safe, keep-alive pooled), created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+            _client = httpx.Client(transport=SyncRetryingTransport(httpx.HTTPTransport(limits=limits)),
+                                   timeout=_timeout(HTTP_TIMEOUT_SECONDS), headers=DEFAULT_HEADERS)
+        return _client
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
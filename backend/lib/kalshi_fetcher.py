@@ -1,10 +1,19 @@
-import requests
+import asyncio
+import logging
+import os
+import httpx
+from lib.http_client import async_client, get_client
+from lib.records import decode_kalshi_page
 
-BASE_URL = 'https://api.elections.kalshi.com/trade-api/v2'
+logger = logging.getLogger(__name__)
+
+# Overridable so scans can run against a local mock exchange (see bench/)
+BASE_URL = os.getenv('KALSHI_API_BASE', 'https://api.elections.kalshi.com/trade-api/v2')
+MARKETS_PAGE_LIMIT = 1000  # Max page size the /markets endpoint allows
 
 def fetch_tags_for_categories():
     """Fetch category-to-tags mapping to help find 'Individual Sports Games'"""
-    resp = requests.get(f"{BASE_URL}/search/tags_by_categories")
+    resp = get_client().get(f"{BASE_URL}/search/tags_by_categories")
     resp.raise_for_status()
     return resp.json()["tags_by_categories"]
 
@@ -15,20 +24,93 @@ def get_series_list(category=None, tags=None):
         params["category"] = category
     if tags:
         params["tags"] = tags  # Should be a comma-separated string if multiple
-    resp = requests.get(f"{BASE_URL}/series", params=params)
+    resp = get_client().get(f"{BASE_URL}/series", params=params)
     resp.raise_for_status()
     return resp.json()["series"]
 
-def get_open_markets_for_series(series_ticker):
-    """Fetch all open markets for a specific series ticker."""
+def _markets_params(series_ticker, cursor=None):
     params = {
         "series_ticker": series_ticker,
         "status": "open",  # Only get active/open markets
-        "limit": 1000      # Fetch up to 1000 per page (max allowed)
+        "limit": MARKETS_PAGE_LIMIT
     }
-    resp = requests.get(f"{BASE_URL}/markets", params=params)
-    resp.raise_for_status()
-    return resp.json()["markets"]
+    if cursor:
+        params["cursor"] = cursor
+    return params
+
+def iter_open_markets_for_series(series_ticker):
+    """Yield every open market (a KalshiMarketRecord) for a series, following the response cursor page by page."""
+    cursor = None
+    while True:
+        resp = get_client().get(f"{BASE_URL}/markets", params=_markets_params(series_ticker, cursor))
+        resp.raise_for_status()
+        markets, cursor = decode_kalshi_page(resp.content)
+        yield from markets
+        if not cursor:
+            return
+
+def get_open_markets_for_series(series_ticker):
+    """Fetch all open markets for a specific series ticker."""
+    return list(iter_open_markets_for_series(series_ticker))
+
+async def _page_series(client, series_ticker, queue, errors):
+    """Producer: walks one series' cursor chain, pushing (series_ticker, markets) pages onto the queue.
+    Failures are appended to `errors`; always finishes by pushing None so the
+    consumer knows this series is exhausted."""
+    cursor = None
+    try:
+        while True:
+            resp = await client.get(f"{BASE_URL}/markets", params=_markets_params(series_ticker, cursor))
+            resp.raise_for_status()
+            markets, cursor = decode_kalshi_page(resp.content)
+            await queue.put((series_ticker, markets))
+            if not cursor:
+                break
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        logger.warning("Failed to page series %s: %s", series_ticker, e)
+        errors.append(e)
+    finally:
+        await queue.put(None)
+
+async def stream_open_markets(client, series_tickers, with_series=False, raise_errors=True):
+    """
+    Async generator over the open markets (KalshiMarketRecords) of many
+    series. Every series is paged concurrently (pages within a series still
+    follow the cursor chain), and markets are yielded as soon as their page
+    lands so callers can start matching before the slowest series finishes. With `with_series=True`
+    yields (series_ticker, market) tuples instead.
+
+    If any series fails, the error is re-raised once the other series are
+    drained (unless `raise_errors=False`), so callers never mistake a partial
+    fetch for a complete one.
+    """
+    queue = asyncio.Queue()
+    errors = []
+    producers = [asyncio.create_task(_page_series(client, t, queue, errors)) for t in series_tickers]
+    remaining = len(producers)
+    try:
+        while remaining:
+            page = await queue.get()
+            if page is None:
+                remaining -= 1
+                continue
+            series_ticker, markets = page
+            for market in markets:
+                yield (series_ticker, market) if with_series else market
+        if errors and raise_errors:
+            raise errors[0]
+    finally:
+        for task in producers:
+            task.cancel()
+
+async def _collect_open_markets(series_tickers):
+    """Gathers {series_ticker: [markets]} for main() using the streaming engine."""
+    by_series = {t: [] for t in series_tickers}
+    async with async_client() as client:
+        async for series_ticker, market in stream_open_markets(client, series_tickers, with_series=True,
+                                                             raise_errors=False):
+            by_series[series_ticker].append(market)
+    return by_series
 
 def main():
     tag_map = fetch_tags_for_categories()
@@ -46,11 +128,12 @@ def main():
     series_list = get_series_list(category=category, tags=tag)
     print(f"Found {len(series_list)} series for category={category}, tag={tag}")
 
-    # 3. Query open (active) markets from each series
+    # 3. Query open (active) markets from every series concurrently
+    by_series = asyncio.run(_collect_open_markets([s['ticker'] for s in series_list]))
     all_markets = []
     for s in series_list:
         series_ticker = s['ticker']
-        markets = get_open_markets_for_series(series_ticker)
+        markets = by_series[series_ticker]
         if markets:
             print(f"Series '{s['title']}' ({series_ticker}): {len(markets)} open markets")
         all_markets.extend(markets)
@@ -58,7 +141,7 @@ def main():
     print(f"Total active 'Individual Sports Games' markets: {len(all_markets)}")
     # Uncomment to display the market tickers:
     # for m in all_markets:
-    #     print(f"{m['ticker']} - {m['title']}")
+    #     print(f"{m.ticker} - {m.title}")
     # (Or save/process as needed...)
 
 if __name__ == "__main__":
@@ -1,15 +1,25 @@
-import requests
-import re
-# from rapidfuzz import fuzz
+import asyncio
 import json
+import logging
+import os
+from lib.http_client import get_client
+from datetime import date
+# from rapidfuzz import fuzz
+from lib.team_resolver import parse_ticker, poly_abbr
+from lib.fuzzy_match import FuzzyMatchIndex
+from lib.records import decode_polymarket_events, decode_polymarket_market
 
-with open('lib/dictionaries/abbreviations.json', 'r') as f:
-    kalshi_poly_dict = json.load(f)
+logger = logging.getLogger(__name__)
 
 # --- GLOBAL CONFIGURATION ---
 POLY_WEB_BASE = "https://polymarket.com/event"
-POLY_SEARCH_API = "https://gamma-api.polymarket.com/public-search"
-POLY_SLUG_API = "https://gamma-api.polymarket.com/markets/slug"
+# Overridable so scans can run against a local mock exchange (see bench/)
+POLY_GAMMA_BASE = os.getenv('POLY_GAMMA_API_BASE', 'https://gamma-api.polymarket.com')
+POLY_SEARCH_API = f"{POLY_GAMMA_BASE}/public-search"
+POLY_SLUG_API = f"{POLY_GAMMA_BASE}/markets/slug"
+POLY_SPORTS_API = f"{POLY_GAMMA_BASE}/sports"
+POLY_EVENTS_API = f"{POLY_GAMMA_BASE}/events"
+CATALOG_PAGE_SIZE = 100  # Events per /events page; each event embeds its markets
 
 # Automates League Translation
 # Key: The text to look for in Kalshi Ticker
@@ -21,62 +31,163 @@ LEAGUE_CONFIG = {
     "mlb": "mlb"
 }
 
+# Kalshi league (the series infix, KX<LEAGUE>GAME) -> the Gamma /sports code its games are listed under.
+# The catalog loads only these sports and files their markets under the Kalshi league, which is also
+# the fuzzy index's block key. Leagues added through LEAGUE_SERIES whose code differs on Gamma need an
+# entry, e.g. LEAGUE_GAMMA_SPORTS='{"EPL": "epl", "LALIGA": "lal"}'; unmapped leagues use their lowercase name.
+GAMMA_SPORTS = {**{league.upper(): sport for league, sport in LEAGUE_CONFIG.items()},
+                **{league.upper(): sport for league, sport in
+                   json.loads(os.getenv('LEAGUE_GAMMA_SPORTS', '{}')).items()}}
+
+def gamma_sport(league: str) -> str:
+    return GAMMA_SPORTS.get(league.upper(), league.lower())
+
+class PolymarketCatalog:
+    """
+    Slug -> PolymarketMarketRecord index of every open game market of the
+    given Kalshi leagues (every GAMMA_SPORTS league when None), built once per scan from Gamma's paged /events
+    listing (one sequence of pages per league series). Records are decoded the
+    same way as /markets/slug/{slug} responses, so matching against it is a
+    local dict lookup.
+    Once loaded, `index` fuzzy-matches markets that have no deterministic slug.
+    """
+    def __init__(self, leagues=None):
+        self.leagues = {gamma_sport(league): league.upper() for league in leagues or GAMMA_SPORTS}  # sport -> league
+        self.markets = {}
+        self.league_of = {}  # slug -> Kalshi league of the Gamma series it was listed under
+        self.index = None
+        self.loaded = False
+        self.requests = 0
+
+    async def load(self, client):
+        resp = await client.get(POLY_SPORTS_API)
+        self.requests += 1
+        resp.raise_for_status()
+        series_ids = {str(s['series']): self.leagues[s['sport']] for s in resp.json()
+                      if s.get('sport') in self.leagues and s.get('series')}
+        await asyncio.gather(*(self._load_series(client, series_id, league)
+                               for series_id, league in series_ids.items()))
+        self.index = FuzzyMatchIndex(self.markets.values(), lambda market: self.league_of.get(market.slug))
+        self.loaded = True
+        logger.info("Polymarket catalog: %d markets from %d requests", len(self.markets), self.requests)
+
+    async def _load_series(self, client, series_id, league):
+        offset = 0
+        while True:
+            resp = await client.get(POLY_EVENTS_API, params={
+                "series_id": series_id, "closed": "false", "limit": CATALOG_PAGE_SIZE, "offset": offset
+            })
+            self.requests += 1
+            resp.raise_for_status()
+            markets, events = decode_polymarket_events(resp.content)
+            for market in markets:
+                self.markets[market.slug] = market
+                self.league_of[market.slug] = league
+            if events < CATALOG_PAGE_SIZE:
+                return
+            offset += CATALOG_PAGE_SIZE
+
+    def get(self, slug):
+        return self.markets.get(slug)
+
 class MarketMatcher:
-    def __init__(self):
-        self.months = {
-            "jan":"01","feb":"02","mar":"03","apr":"04","may":"05","jun":"06",
-            "jul":"07","aug":"08","sep":"09","oct":"10","nov":"11","dec":"12"
-        }
+    def __init__(self, cache=None, catalog=None):
+        # Optional slug-resolution cache (see slug_cache.SlugCache): lookup(slug) -> True/False/None,
+        # record(slug, found, game_date). Known misses are skipped without a request.
+        self.cache = cache
+        # Optional PolymarketCatalog; once loaded, slugs found in it need no request at all
+        self.catalog = catalog
+
+    def _from_catalog(self, slug):
+        if self.catalog is None or not self.catalog.loaded:
+            return None
+        return self.catalog.get(slug)
+
+    def _fuzzy(self, kalshi_market, same_day=False):
+        """
+        Best blocked fuzzy match from the loaded catalog, with its confidence as
+        match_score. `same_day` for tickers that parsed but whose slug isn't
+        listed: their date is exact, and a rematch a day away is another game.
+        """
+        if self.catalog is None or not self.catalog.loaded or self.catalog.index is None:
+            return None
+        found = self.catalog.index.match(kalshi_market, date_slack=0) if same_day else \
+            self.catalog.index.match(kalshi_market)
+        if not found:
+            return None
+        market, score = found
+        return market.scored(score)
+
+    def _known_miss(self, slug):
+        return self.cache is not None and self.cache.lookup(slug) is False
+
+    def _record(self, slug, ticker, status_code):
+        # Only a definite answer is cached; 5xx/429 say nothing about the slug
+        if self.cache is None or status_code not in (200, 404):
+            return
+        info = parse_ticker(ticker)
+        self.cache.record(slug, status_code == 200, date.fromisoformat(info.date) if info else None)
 
     def _exact_match_sports_slug(self, ticker):
-        """Automates slug creation by detecting league and parsing date/teams."""
-        ticker = ticker.lower()
-        
-        # 1. Automate League Detection
-        league_prefix = next((v for k, v in LEAGUE_CONFIG.items() if k in ticker), None)
-        if not league_prefix:       
+        """Builds the Polymarket slug for a Kalshi game ticker from its parsed league/date/teams."""
+        info = parse_ticker(ticker)
+        if not info:
+            return None
+        league_prefix = LEAGUE_CONFIG.get(info.league.lower())
+        if not league_prefix:
             return None
 
-        # 2. Corrected Pattern: Year(2)Month(3)Day(2)Away(3)Home(3)
-        # Ticker: 25dec23bknphi -> yr=25, mon=dec, day=23
-        match = re.search(r'(\d{2})([a-z]{3})(\d{2})([a-z]{3})([a-z]{3})', ticker)
-        
-        if match:
-            # Re-mapping the groups to the correct order
-            yr, mon, day, away, home = match.groups()
-
-            away = kalshi_poly_dict[league_prefix.upper()][away.upper()]['poly_abbr'].lower()
-            home = kalshi_poly_dict[league_prefix.upper()][home.upper()]['poly_abbr'].lower()
-            
-            # Format to ISO: 2025-12-23
-            iso_date = f"20{yr}-{self.months.get(mon, '01')}-{day}"
-            
-            # Generate slug: nba-bkn-phi-2025-12-23
-            return f"{league_prefix}-{away}-{home}-{iso_date}"
-            
-        return None
-        
+        # Ticker: KXNBAGAME-25DEC23BKNPHI-BKN -> nba-bkn-phi-2025-12-23
+        away = poly_abbr(info.league, info.away).lower()
+        home = poly_abbr(info.league, info.home).lower()
+        return f"{league_prefix}-{away}-{home}-{info.date}"
 
     def find_polymarket_match(self, kalshi_market):
-        """Main entry point: Orchestrates deterministic check vs. fuzzy search."""
-        ticker = kalshi_market.get('ticker', '')
-        title = kalshi_market.get('title', '')
+        """
+        Main entry point: the deterministic slug (catalog, then /markets/slug)
+        with match_score 1.0, else the catalog's blocked fuzzy match. Returns
+        a PolymarketMarketRecord or None.
+        """
+        ticker = kalshi_market.ticker
 
         # STEP 1: Attempt Automated Slug Match (Fast/Accurate)
         generated_slug = self._exact_match_sports_slug(ticker)
-        if generated_slug:
-            
-            # print(f"DEBUG: Testing predicted slug -> {generated_slug}")
+        cached = generated_slug and self._from_catalog(generated_slug)
+        if cached:
+            return cached
+        if generated_slug and not self._known_miss(generated_slug):
+            resp = get_client().get(f"{POLY_SLUG_API}/{generated_slug}")
+            self._record(generated_slug, ticker, resp.status_code)
+            if resp.status_code == 200:
+                return decode_polymarket_market(resp.content)
 
+        # STEP 2: No (listed) slug for this ticker; search the catalog
+        return self._fuzzy(kalshi_market, same_day=bool(generated_slug))
 
-            resp = requests.get(f"{POLY_SLUG_API}/{generated_slug}")
-            if resp.status_code == 200:
-                data = resp.json()
-                # Ensure we have the event slug for the URL
-                data['final_url'] = f"{POLY_WEB_BASE}/{data.get('slug')}"
-                return data
+    async def find_polymarket_match_async(self, kalshi_market, client):
+        """Async variant of find_polymarket_match using a shared httpx.AsyncClient.
+
+        The returned record holds the outcomes and prices of the /markets/slug
+        response (or the identical catalog entry), so callers can price from it
+        instead of requesting the same slug again. `match_score` is 1.0 for slug
+        matches and the fuzzy confidence otherwise.
+        """
+        ticker = kalshi_market.ticker
+        generated_slug = self._exact_match_sports_slug(ticker)
+        if not generated_slug:
+            return self._fuzzy(kalshi_market)
+        cached = self._from_catalog(generated_slug)
+        if cached:
+            return cached
+        # Not in the catalog (or no catalog): fall back to the per-slug endpoint
+        if self._known_miss(generated_slug):
+            return self._fuzzy(kalshi_market, same_day=True)
+
+        resp = await client.get(f"{POLY_SLUG_API}/{generated_slug}")
+        self._record(generated_slug, ticker, resp.status_code)
+        if resp.status_code != 200:
+            return self._fuzzy(kalshi_market, same_day=True)
+        return decode_polymarket_market(resp.content)
 
-        return None
-    
 # --- RUNNING THE MATCHER ---
 matcher = MarketMatcher()
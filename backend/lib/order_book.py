@@ -0,0 +1,291 @@
+"""
+Order-book depth for executable arbitrage.
+
+Books are kept as parallel sorted arrays (int64 price units from
+lib.arbitrage_engine, float sizes) and updated in place by level deltas, so a
+websocket delta is a bisect plus an insert/overwrite instead of a rebuild.
+
+Kalshi books only carry bids: buying YES at p means lifting a NO bid at 1 - p,
+and vice versa. Polymarket CLOB books are one per outcome token with real asks.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import threading
+from array import array
+from decimal import Decimal
+from typing import NamedTuple, Optional
+import httpx
+from lib.arbitrage_engine import PRICE_SCALE
+from lib.kalshi_fetcher import BASE_URL
+
+logger = logging.getLogger(__name__)
+
+KALSHI_BOOK_API = BASE_URL + "/markets/{ticker}/orderbook"
+POLY_BOOKS_API = os.getenv('POLY_CLOB_API_BASE', 'https://clob.polymarket.com') + "/books"
+POLY_BOOKS_BATCH = 100  # token ids per POST /books
+PROFIT_CURVE_POINTS = 20  # Curve points kept per pair (one per swept level pair, capped)
+
+def to_unit(price) -> int:
+    return int((Decimal(str(price)) * PRICE_SCALE).to_integral_value())
+
+class BookSide:
+    """One side of a book as parallel arrays sorted ascending by price units."""
+    __slots__ = ('prices', 'sizes')
+
+    def __init__(self):
+        self.prices = array('q')
+        self.sizes = array('d')
+
+    def set(self, price: int, size: float):
+        """Sets the absolute size resting at `price`; size <= 0 removes the level."""
+        i = bisect.bisect_left(self.prices, price)
+        present = i < len(self.prices) and self.prices[i] == price
+        if size <= 0:
+            if present:
+                del self.prices[i]
+                del self.sizes[i]
+        elif present:
+            self.sizes[i] = size
+        else:
+            self.prices.insert(i, price)
+            self.sizes.insert(i, size)
+
+    def add(self, price: int, delta: float):
+        """Applies a relative size change at `price` (Kalshi orderbook_delta semantics)."""
+        i = bisect.bisect_left(self.prices, price)
+        current = self.sizes[i] if i < len(self.prices) and self.prices[i] == price else 0.0
+        self.set(price, current + delta)
+
+    def replace(self, levels):
+        """Resets the side from (price_units, size) pairs in any order."""
+        levels = sorted((p, s) for p, s in levels if s > 0)
+        self.prices = array('q', (p for p, _ in levels))
+        self.sizes = array('d', (s for _, s in levels))
+
+    def best_high(self) -> Optional[int]:
+        return self.prices[-1] if self.prices else None
+
+    def best_low(self) -> Optional[int]:
+        return self.prices[0] if self.prices else None
+
+class KalshiBook:
+    """Kalshi market book: YES bids and NO bids. Asks for one side are the other side's bids complemented."""
+    __slots__ = ('yes_bids', 'no_bids')
+
+    def __init__(self):
+        self.yes_bids = BookSide()
+        self.no_bids = BookSide()
+
+    def apply_snapshot(self, yes_levels, no_levels):
+        self.yes_bids.replace(yes_levels)
+        self.no_bids.replace(no_levels)
+
+    def apply_delta(self, side: str, price: int, delta: float):
+        (self.yes_bids if side == 'yes' else self.no_bids).add(price, delta)
+
+    def asks(self, side: str):
+        """(prices ascending, sizes) to buy `side` ('yes' or 'no')."""
+        bids = self.no_bids if side == 'yes' else self.yes_bids
+        return [PRICE_SCALE - p for p in reversed(bids.prices)], list(reversed(bids.sizes))
+
+    def best_ask(self, side: str) -> Optional[int]:
+        best_bid = (self.no_bids if side == 'yes' else self.yes_bids).best_high()
+        return PRICE_SCALE - best_bid if best_bid is not None else None
+
+class ClobBook:
+    """Polymarket CLOB book for one outcome token."""
+    __slots__ = ('bids', 'asks_side')
+
+    def __init__(self):
+        self.bids = BookSide()
+        self.asks_side = BookSide()
+
+    def apply_snapshot(self, bids, asks):
+        self.bids.replace(bids)
+        self.asks_side.replace(asks)
+
+    def apply_change(self, side: str, price: int, size: float):
+        """Polymarket price_change: `side` BUY/SELL, `size` is the new total at that level."""
+        (self.bids if side.upper() == 'BUY' else self.asks_side).set(price, size)
+
+    def asks(self):
+        return list(self.asks_side.prices), list(self.asks_side.sizes)
+
+    def best_ask(self) -> Optional[int]:
+        return self.asks_side.best_low()
+
+class SweepResult(NamedTuple):
+    size: float          # Max contracts buyable on both legs while each unit still locks in profit
+    profit: float        # Total profit in dollars at that size
+    cost: float          # Total cost in dollars at that size
+    curve: list          # [(cumulative size, cumulative profit)] after each level step
+
+# Depth of a pair whose top of book shows no arbitrage
+EMPTY_SWEEP = SweepResult(0.0, 0.0, 0.0, [])
+
+def sweep(asks_a, asks_b) -> SweepResult:
+    """
+    Walks two ask ladders (prices ascending in units, sizes) together, buying one
+    contract of each leg per unit of size for as long as the combined price is
+    below $1. Each step consumes the smaller remaining level.
+    """
+    prices_a, sizes_a = asks_a
+    prices_b, sizes_b = asks_b
+    i = j = 0
+    left_a = sizes_a[0] if sizes_a else 0.0
+    left_b = sizes_b[0] if sizes_b else 0.0
+    size = profit_units = cost_units = 0.0
+    curve = []
+    while i < len(prices_a) and j < len(prices_b):
+        unit_cost = prices_a[i] + prices_b[j]
+        if unit_cost >= PRICE_SCALE:
+            break
+        qty = min(left_a, left_b)
+        size += qty
+        cost_units += qty * unit_cost
+        profit_units += qty * (PRICE_SCALE - unit_cost)
+        curve.append((size, profit_units / PRICE_SCALE))
+        left_a -= qty
+        left_b -= qty
+        if left_a <= 0:
+            i += 1
+            left_a = sizes_a[i] if i < len(sizes_a) else 0.0
+        if left_b <= 0:
+            j += 1
+            left_b = sizes_b[j] if j < len(sizes_b) else 0.0
+    if len(curve) > PROFIT_CURVE_POINTS:
+        step = len(curve) / PROFIT_CURVE_POINTS
+        curve = [curve[int(k * step)] for k in range(1, PROFIT_CURVE_POINTS)] + [curve[-1]]
+    return SweepResult(size, profit_units / PRICE_SCALE, cost_units / PRICE_SCALE, curve)
+
+class OrderBookStore:
+    """
+    Books for every tracked Kalshi ticker and Polymarket token id, fed by REST
+    snapshots during scans and websocket deltas from the live feed. Both run on
+    different threads, so every access goes through the store's lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kalshi = {}      # ticker -> KalshiBook
+        self._polymarket = {}  # token id -> ClobBook
+
+    def apply_kalshi_snapshot(self, ticker: str, orderbook: dict):
+        """Replaces a Kalshi book from a REST `orderbook` or websocket `orderbook_snapshot` body."""
+        book = KalshiBook()
+        book.apply_snapshot(_kalshi_levels(orderbook, 'yes'), _kalshi_levels(orderbook, 'no'))
+        with self._lock:
+            self._kalshi[ticker] = book
+        return self.kalshi_top(ticker)
+
+    def retain(self, tickers, token_ids):
+        """Drops the books of Kalshi tickers and Polymarket tokens that are no longer tracked."""
+        with self._lock:
+            for books, keep in ((self._kalshi, tickers), (self._polymarket, token_ids)):
+                for key in [key for key in books if key not in keep]:
+                    del books[key]
+
+    def apply_kalshi_delta(self, ticker: str, side: str, price: int, delta: float):
+        with self._lock:
+            book = self._kalshi.get(ticker)
+            if book is None:
+                return None  # Deltas before the snapshot can't be placed
+            book.apply_delta(side, price, delta)
+        return self.kalshi_top(ticker)
+
+    def kalshi_top(self, ticker: str):
+        """(best YES ask, best NO ask) in price units, None per side when empty."""
+        with self._lock:
+            book = self._kalshi.get(ticker)
+            return (book.best_ask('yes'), book.best_ask('no')) if book else (None, None)
+
+    def apply_clob_snapshot(self, token_id: str, bids, asks) -> Optional[int]:
+        """Replaces a token's book from CLOB levels ({price, size} dicts); returns its best ask."""
+        book = ClobBook()
+        book.apply_snapshot([(to_unit(l['price']), float(l['size'])) for l in bids],
+                            [(to_unit(l['price']), float(l['size'])) for l in asks])
+        with self._lock:
+            self._polymarket[token_id] = book
+            return book.best_ask()
+
+    def apply_clob_change(self, token_id: str, side: str, price: int, size: float) -> Optional[int]:
+        with self._lock:
+            book = self._polymarket.get(token_id)
+            if book is None:
+                return None
+            book.apply_change(side, price, size)
+            return book.best_ask()
+
+    def executable(self, pair: dict, poly_row: dict) -> Optional[SweepResult]:
+        """
+        Sweeps the books behind a pair's direction, or None when a leg's book is
+        unknown. pair['team_outcome'] is the index of the Kalshi team among the
+        Polymarket outcomes; NO on Polymarket is bought as YES on the other
+        outcome, as in detect_arbitrage.
+        """
+        direction = pair.get('direction') or ''
+        token_ids = poly_row.get('token_ids') or ()
+        outcome = pair.get('team_outcome')
+        if outcome is None or len(token_ids) != 2:
+            return None
+        with self._lock:
+            kalshi = self._kalshi.get(pair['kalshi_ticker'])
+            if direction.startswith('YES_Kalshi'):
+                clob = self._polymarket.get(token_ids[1 - outcome])
+                legs = (kalshi.asks('yes'), clob.asks()) if kalshi and clob else None
+            elif direction.startswith('YES_Poly'):
+                clob = self._polymarket.get(token_ids[outcome])
+                legs = (clob.asks(), kalshi.asks('no')) if kalshi and clob else None
+            else:
+                legs = None
+        return sweep(*legs) if legs else None
+
+    async def fetch(self, client, tickers, token_ids, semaphore):
+        """REST snapshots for the given Kalshi tickers (one request each) and tokens (batched POST /books)."""
+        async def kalshi_one(ticker):
+            async with semaphore:
+                resp = await client.get(KALSHI_BOOK_API.format(ticker=ticker))
+            resp.raise_for_status()
+            self.apply_kalshi_snapshot(ticker, resp.json().get('orderbook') or {})
+
+        async def poly_batch(batch):
+            async with semaphore:
+                resp = await client.post(POLY_BOOKS_API, json=[{"token_id": t} for t in batch])
+            resp.raise_for_status()
+            for book in resp.json():
+                self.apply_clob_snapshot(book['asset_id'], book.get('bids', []), book.get('asks', []))
+
+        token_ids = list(token_ids)
+        results = await asyncio.gather(
+            *(kalshi_one(t) for t in tickers),
+            *(poly_batch(token_ids[i:i + POLY_BOOKS_BATCH]) for i in range(0, len(token_ids), POLY_BOOKS_BATCH)),
+            return_exceptions=True,
+        )
+        for result in results:
+            # A missing book only leaves that pair's depth unknown
+            if isinstance(result, (httpx.HTTPError, KeyError, ValueError)):
+                logger.warning("Order book fetch failed: %r", result)
+            elif isinstance(result, Exception):
+                raise result
+
+def _kalshi_levels(orderbook: dict, side: str):
+    """Kalshi levels as (price_units, size), preferring the *_dollars arrays over legacy cents."""
+    if orderbook.get(f'{side}_dollars') is not None:
+        return [(to_unit(p), float(q)) for p, q in orderbook[f'{side}_dollars']]
+    return [(int(p) * PRICE_SCALE // 100, float(q)) for p, q in orderbook.get(side) or []]
+
+def from_unit(units: Optional[int]) -> Optional[Decimal]:
+    return Decimal(units) / PRICE_SCALE if units is not None else None
+
+def executable_fields(result: Optional[SweepResult]) -> dict:
+    """Pair/MarketMatchMap fields for a sweep; None values mean the depth is unknown."""
+    if result is None:
+        return {'executable_size': None, 'executable_profit': None, 'profit_curve': None}
+    return {
+        'executable_size': Decimal(str(round(result.size, 6))),
+        'executable_profit': Decimal(str(round(result.profit, 6))),
+        'profit_curve': [[round(s, 6), round(p, 6)] for s, p in result.curve],
+    }
+
+order_books = OrderBookStore()
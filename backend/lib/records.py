@@ -0,0 +1,179 @@
+"""
+Compact records for the exchange payloads a scan keeps in memory.
+
+A Kalshi /markets entry or a Gamma market carries dozens of fields; scans use
+a handful. The decoders below read only those fields out of each response
+body and keep them in __slots__ records, so a scan holds neither the full
+dicts nor the per-instance __dict__ of every market. Gamma's JSON-encoded
+`outcomes` / `outcomePrices` / `clobTokenIds` strings are decoded once, here.
+
+Bodies are decoded with json and projected onto records right away, so only
+one response's full tree is alive at a time. Bodies of at least
+JSON_STREAM_MIN_BYTES are instead parsed as an ijson event stream (when ijson
+is installed; its C backend is picked automatically) in which unwanted fields
+are never built at all: that caps a huge page's peak at little more than its
+records, but costs about three times the CPU of json, so ordinary pages don't.
+"""
+import json
+import os
+
+try:
+    import ijson
+except ImportError:  # Optional: json + projection gives the same records
+    ijson = None
+
+JSON_STREAM_MIN_BYTES = int(os.getenv('JSON_STREAM_MIN_BYTES', str(4 * 1024 * 1024)))
+
+_SCALAR_EVENTS = frozenset({'null', 'boolean', 'integer', 'double', 'number', 'string'})
+_ELEMENT_EVENTS = _SCALAR_EVENTS | {'start_map', 'start_array'}  # Events that begin a value
+
+def _json_list(value) -> tuple:
+    """Gamma sends lists either as JSON-encoded strings or as lists; malformed values count as empty."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return ()
+    return tuple(value) if isinstance(value, list) else ()
+
+class _Record:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class KalshiMarketRecord(_Record):
+    """The fields of a Kalshi /markets entry that scans use (same names as the API)."""
+    __slots__ = ('ticker', 'event_ticker', 'title', 'yes_sub_title', 'status', 'yes_ask_dollars', 'no_ask_dollars',
+                 'close_time', 'expected_expiration_time')
+    JSON_FIELDS = __slots__
+
+    def __init__(self, ticker, event_ticker=None, title=None, yes_sub_title=None, status=None, yes_ask_dollars=None,
+                 no_ask_dollars=None, close_time=None, expected_expiration_time=None):
+        self.ticker = ticker or ''
+        self.event_ticker = event_ticker
+        self.title = title
+        self.yes_sub_title = yes_sub_title
+        self.status = status
+        self.yes_ask_dollars = yes_ask_dollars
+        self.no_ask_dollars = no_ask_dollars
+        self.close_time = close_time
+        self.expected_expiration_time = expected_expiration_time
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'KalshiMarketRecord':
+        return cls(**{field: data.get(field) for field in cls.JSON_FIELDS})
+
+class PolymarketMarketRecord(_Record):
+    """
+    A Gamma market (from /markets/slug or an /events listing) reduced to what
+    matching and pricing read. `outcomes`, `outcome_prices` (as sent, usually
+    strings) and `token_ids` are tuples; `match_score` is the matcher's
+    confidence that this is the Kalshi game it was looked up for.
+    """
+    __slots__ = ('slug', 'question', 'outcomes', 'outcome_prices', 'token_ids', 'game_start_time', 'end_date',
+                 'market_type', 'match_score')
+    JSON_FIELDS = ('slug', 'question', 'outcomes', 'outcomePrices', 'clobTokenIds', 'gameStartTime', 'endDate',
+                   'sportsMarketType')
+
+    def __init__(self, slug, question=None, outcomes=(), outcome_prices=(), token_ids=(), game_start_time=None,
+                 end_date=None, market_type=None, match_score=1.0):
+        self.slug = slug
+        self.question = question
+        self.outcomes = outcomes
+        self.outcome_prices = outcome_prices
+        self.token_ids = token_ids
+        self.game_start_time = game_start_time
+        self.end_date = end_date
+        self.market_type = market_type
+        self.match_score = match_score
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'PolymarketMarketRecord':
+        return cls(data.get('slug'), data.get('question'), _json_list(data.get('outcomes')),
+                   _json_list(data.get('outcomePrices')), _json_list(data.get('clobTokenIds')),
+                   data.get('gameStartTime'), data.get('endDate'), data.get('sportsMarketType'))
+
+    def scored(self, match_score: float) -> 'PolymarketMarketRecord':
+        """This market as a match with the given confidence; the catalog's shared record is left as is."""
+        return PolymarketMarketRecord(self.slug, self.question, self.outcomes, self.outcome_prices, self.token_ids,
+                                      self.game_start_time, self.end_date, self.market_type, match_score)
+
+def _walk(node, parts):
+    """Values at an ijson-style path ('markets.item', 'item.markets.item') of a decoded document."""
+    if not parts:
+        yield node
+        return
+    head, rest = parts[0], parts[1:]
+    if head == 'item':
+        for child in node if isinstance(node, list) else ():
+            yield from _walk(child, rest)
+    elif isinstance(node, dict) and head in node:
+        yield from _walk(node[head], rest)
+
+def _select_json(content: bytes, prefix: str, keys, scalars, count):
+    data = json.loads(content)
+    objects = [o for o in _walk(data, prefix.split('.') if prefix else []) if isinstance(o, dict)]
+    found = {path: next(_walk(data, path.split('.')), None) for path in scalars}
+    counted = sum(1 for _ in _walk(data, count.split('.'))) if count else None
+    return objects, found, counted
+
+def _select_stream(content: bytes, prefix: str, keys, scalars, count):
+    base = f"{prefix}." if prefix else ''
+    fields = {base + key: key for key in keys}
+    items = {f"{base}{key}.item": key for key in keys}  # Fields sent as flat lists
+    scalars = set(scalars)
+    objects, found, counted = [], {}, 0
+    current = None
+    try:
+        for path, event, value in ijson.parse(content, use_float=True):
+            if path == prefix and event in ('start_map', 'end_map'):
+                if event == 'start_map':
+                    current = {}
+                else:
+                    objects.append(current)
+                    current = None
+            elif current is not None and path in fields:
+                if event == 'start_array':
+                    current[fields[path]] = []
+                elif event in _SCALAR_EVENTS:
+                    current[fields[path]] = value
+            elif current is not None and path in items:
+                if event in _SCALAR_EVENTS and isinstance(current.get(items[path]), list):
+                    current[items[path]].append(value)
+            elif path in scalars and event in _SCALAR_EVENTS:
+                found[path] = value
+            if path == count and event in _ELEMENT_EVENTS:
+                counted += 1
+    except ijson.JSONError as e:
+        raise ValueError(f"Malformed JSON body: {e}") from e
+    return objects, found, counted if count else None
+
+def _select(content: bytes, prefix: str, keys, scalars=(), count=None):
+    """
+    (objects, scalars, count) from a JSON body: a dict of the top-level `keys`
+    of every object at the ijson-style `prefix`, the values at the `scalars`
+    paths, and how many elements sit at the `count` path (None if not asked).
+    Raises ValueError on malformed JSON, whichever parser is used.
+    """
+    select = _select_stream if ijson is not None and len(content) >= JSON_STREAM_MIN_BYTES else _select_json
+    return select(content, prefix, tuple(keys), tuple(scalars), count)
+
+def decode_kalshi_page(content: bytes):
+    """([KalshiMarketRecord], next cursor or None) from a /markets response body; ValueError if it has no markets list."""
+    objects, found, lists = _select(content, 'markets.item', KalshiMarketRecord.JSON_FIELDS, scalars=('cursor',),
+                                    count='markets')
+    if not lists:
+        raise ValueError("/markets response has no 'markets'")
+    return [KalshiMarketRecord.from_json(o) for o in objects], found.get('cursor')
+
+def decode_polymarket_events(content: bytes):
+    """([PolymarketMarketRecord], number of events) from a Gamma /events page; markets without a slug are dropped."""
+    objects, _, events = _select(content, 'item.markets.item', PolymarketMarketRecord.JSON_FIELDS, count='item')
+    return [PolymarketMarketRecord.from_json(o) for o in objects if o.get('slug')], events
+
+def decode_polymarket_market(content: bytes) -> PolymarketMarketRecord:
+    """PolymarketMarketRecord from a /markets/slug/{slug} body."""
+    objects, _, _ = _select(content, '', PolymarketMarketRecord.JSON_FIELDS)
+    return PolymarketMarketRecord.from_json(objects[0] if objects else {})
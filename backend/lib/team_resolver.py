@@ -0,0 +1,101 @@
+"""
+Import-once team/league resolver built from dictionaries/abbreviations.json.
+
+Everything that used to load the dictionary itself (and re-run substring scans,
+regexes and nested lookups per market) goes through here instead:
+  - parse_ticker: Kalshi ticker -> TickerInfo(league, date, away, home, team, event_ticker), cached
+  - team / poly_abbr: Kalshi code -> dictionary entry, O(1)
+  - code_for_outcome / is_same_team: Polymarket outcome name (or alias) -> Kalshi code, O(1)
+
+Entries may carry an optional "aliases" list in the JSON for extra outcome spellings.
+"""
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+DICTIONARY_PATH = Path(__file__).resolve().parent / 'dictionaries' / 'abbreviations.json'
+
+MONTHS = {
+    "JAN": "01", "FEB": "02", "MAR": "03", "APR": "04", "MAY": "05", "JUN": "06",
+    "JUL": "07", "AUG": "08", "SEP": "09", "OCT": "10", "NOV": "11", "DEC": "12"
+}
+
+with open(DICTIONARY_PATH, 'r') as f:
+    kalshi_poly_dict = json.load(f)
+
+def _normalize(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+# (league, kalshi code) -> entry
+_by_code = {}
+# (league, normalized outcome name / alias) -> kalshi code
+_by_name = {}
+for _league, _teams in kalshi_poly_dict.items():
+    for _code, _entry in _teams.items():
+        _by_code[(_league, _code)] = _entry
+        for _alias in (_entry['name'], f"{_entry['city']} {_entry['name']}", _entry['poly_slug'],
+                       _entry['poly_abbr'], _code, *_entry.get('aliases', ())):
+            _by_name.setdefault((_league, _normalize(_alias)), _code)
+
+LEAGUES = tuple(kalshi_poly_dict)
+# Series look like KXNBAGAME; the event segment like 25DEC23BKNPHI (yy mon dd away home)
+_SERIES_RE = re.compile(r'^KX(' + '|'.join(LEAGUES) + r')')
+_EVENT_RE = re.compile(r'^(\d{2})([A-Z]{3})(\d{2})([A-Z]+)$')
+
+class TickerInfo(NamedTuple):
+    league: str               # e.g. 'NBA'
+    date: str                 # ISO game date, e.g. '2025-12-23'
+    away: str                 # Kalshi team codes
+    home: str
+    team: Optional[str]       # The team this market is on (last ticker segment), None for event tickers
+    event_ticker: str         # e.g. 'KXNBAGAME-25DEC23BKNPHI'
+
+def _split_teams(league: str, teams: str):
+    """Splits 'BKNPHI' / 'KCLV' into (away, home) using the league's known codes (2-4 letters)."""
+    for cut in range(2, len(teams) - 1):
+        away, home = teams[:cut], teams[cut:]
+        if (league, away) in _by_code and (league, home) in _by_code:
+            return away, home
+    return None
+
+@lru_cache(maxsize=16384)
+def parse_ticker(ticker: str) -> Optional[TickerInfo]:
+    """Parses a Kalshi game market or event ticker; None if it isn't a known-league head-to-head game."""
+    parts = ticker.upper().split('-')
+    series_match = _SERIES_RE.match(parts[0])
+    if not series_match or len(parts) < 2:
+        return None
+    league = series_match.group(1)
+    event_match = _EVENT_RE.match(parts[1])
+    if not event_match:
+        return None
+    yr, mon, day, teams = event_match.groups()
+    if mon not in MONTHS:
+        return None
+    split = _split_teams(league, teams)
+    if not split:
+        return None
+    return TickerInfo(
+        league=league,
+        date=f"20{yr}-{MONTHS[mon]}-{day}",
+        away=split[0],
+        home=split[1],
+        team=parts[2] if len(parts) > 2 else None,
+        event_ticker=f"{parts[0]}-{parts[1]}",
+    )
+
+def team(league: str, code: str) -> Optional[dict]:
+    return _by_code.get((league, code))
+
+def poly_abbr(league: str, code: str) -> Optional[str]:
+    entry = _by_code.get((league, code))
+    return entry['poly_abbr'] if entry else None
+
+def code_for_outcome(league: str, outcome_name: str) -> Optional[str]:
+    """Kalshi code for a Polymarket outcome name such as 'Nets' or 'Brooklyn Nets'."""
+    return _by_name.get((league, _normalize(outcome_name)))
+
+def is_same_team(kalshi_team_code, outcome_name, league) -> bool:
+    return code_for_outcome(league, outcome_name) == kalshi_team_code
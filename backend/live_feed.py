@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+from decimal import Decimal
+from urllib.parse import urlparse
+import websockets
+from config import (KALSHI_WS_URL, POLYMARKET_WS_URL, KALSHI_API_KEY_ID, KALSHI_PRIVATE_KEY_PATH)
+from price_book import price_book as default_price_book
+from lib.order_book import from_unit, to_unit
+
+logger = logging.getLogger(__name__)
+
+# How often a connected feed checks whether the scanner changed the set of pairs to follow
+RESUBSCRIBE_CHECK_SECONDS = 30
+RECONNECT_MAX_DELAY_SECONDS = 30
+
+def _dollars(msg: dict, field: str):
+    """Reads `<field>_dollars` if present, else the legacy integer-cents `<field>`."""
+    if msg.get(f"{field}_dollars") is not None:
+        return Decimal(str(msg[f"{field}_dollars"]))
+    if msg.get(field) is not None:
+        return Decimal(msg[field]) / 100
+    return None
+
+def handle_kalshi_message(book, message: dict) -> list:
+    """
+    Applies a Kalshi `ticker` or `orderbook_snapshot`/`orderbook_delta` channel
+    message to the book; returns the repriced pairs. Book messages update the
+    order-book store first and the quote is then taken from its top of book.
+    """
+    msg = message.get("msg", {})
+    ticker = msg.get("market_ticker")
+    if message.get("type") == "ticker":
+        yes_ask = _dollars(msg, "yes_ask")
+        yes_bid = _dollars(msg, "yes_bid")
+        # Buying NO costs 1 - (best YES bid)
+        no_ask = Decimal('1') - yes_bid if yes_bid is not None else None
+        return book.apply_kalshi_quote(ticker, yes_ask, no_ask)
+    if message.get("type") == "orderbook_snapshot":
+        yes_ask, no_ask = book.order_books.apply_kalshi_snapshot(ticker, msg)
+    elif message.get("type") == "orderbook_delta":
+        price = _dollars(msg, "price")
+        top = price is not None and book.order_books.apply_kalshi_delta(ticker, msg.get("side"), to_unit(price),
+                                                                        float(msg.get("delta", 0)))
+        if not top:
+            return []
+        yes_ask, no_ask = top
+    else:
+        return []
+    return book.apply_kalshi_quote(ticker, from_unit(yes_ask), from_unit(no_ask))
+
+def handle_polymarket_message(book, message) -> list:
+    """
+    Applies a Polymarket CLOB `market` channel message (or a list of them) to the
+    book using each token's best ask; returns the repriced pairs.
+    """
+    if isinstance(message, list):
+        return [pair for m in message for pair in handle_polymarket_message(book, m)]
+    event_type = message.get("event_type")
+    updated = []
+    if event_type == "book":
+        best_ask = book.order_books.apply_clob_snapshot(message["asset_id"], message.get("bids", []),
+                                                        message.get("asks", []))
+        if best_ask is not None:
+            updated += book.apply_polymarket_price(message["asset_id"], from_unit(best_ask))
+    elif event_type == "price_change":
+        for change in message.get("price_changes", []):
+            best_ask = None
+            if change.get("price") is not None and change.get("size") is not None:
+                best_ask = from_unit(book.order_books.apply_clob_change(
+                    change["asset_id"], change.get("side", ""), to_unit(change["price"]), float(change["size"])))
+            if change.get("best_ask") is not None:
+                best_ask = Decimal(str(change["best_ask"]))
+            if best_ask is not None:
+                updated += book.apply_polymarket_price(change["asset_id"], best_ask)
+    elif event_type == "best_bid_ask":
+        if message.get("best_ask") is not None:
+            updated += book.apply_polymarket_price(message["asset_id"], Decimal(str(message["best_ask"])))
+    return updated
+
+def _kalshi_auth_headers(url: str) -> dict:
+    """Signed handshake headers (RSA-PSS over timestamp + method + path) when an API key is configured."""
+    if not (KALSHI_API_KEY_ID and KALSHI_PRIVATE_KEY_PATH):
+        return {}
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+    with open(KALSHI_PRIVATE_KEY_PATH, 'rb') as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+    timestamp = str(int(time.time() * 1000))
+    signature = private_key.sign(
+        f"{timestamp}GET{urlparse(url).path}".encode(),
+        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH),
+        hashes.SHA256(),
+    )
+    return {
+        "KALSHI-ACCESS-KEY": KALSHI_API_KEY_ID,
+        "KALSHI-ACCESS-SIGNATURE": base64.b64encode(signature).decode(),
+        "KALSHI-ACCESS-TIMESTAMP": timestamp,
+    }
+
+class LiveFeed:
+    """
+    Subscribes to the Kalshi and Polymarket market-data websockets for every pair
+    in the price book and applies each tick through the book's indexes, so only
+    the pairs on the ticked market are repriced. Reconnects with backoff, and
+    resubscribes when a scan changes the set of tracked pairs.
+    """
+    def __init__(self, book=default_price_book, kalshi_url=KALSHI_WS_URL, polymarket_url=POLYMARKET_WS_URL,
+                 on_update=None):
+        self.book = book
+        self.kalshi_url = kalshi_url
+        self.polymarket_url = polymarket_url
+        # Called with the list of repriced pairs after every tick that changed something
+        self.on_update = on_update
+
+    async def run(self):
+        await asyncio.gather(
+            self._run_feed("kalshi", self.kalshi_url, self._kalshi_subscribe, handle_kalshi_message),
+            self._run_feed("polymarket", self.polymarket_url, self._polymarket_subscribe, handle_polymarket_message),
+        )
+
+    def _kalshi_subscribe(self, tickers, token_ids):
+        if not tickers:
+            return None
+        return {"id": 1, "cmd": "subscribe",
+                "params": {"channels": ["ticker", "orderbook_delta"], "market_tickers": tickers}}
+
+    def _polymarket_subscribe(self, tickers, token_ids):
+        if not token_ids:
+            return None
+        return {"type": "market", "assets_ids": token_ids}
+
+    async def _run_feed(self, name, url, make_subscription, handle):
+        delay = 1
+        while True:
+            subscriptions = self.book.subscriptions()
+            subscribe = make_subscription(*subscriptions)
+            if subscribe is None:
+                await asyncio.sleep(RESUBSCRIBE_CHECK_SECONDS)
+                continue
+            headers = _kalshi_auth_headers(url) if name == "kalshi" else {}
+            try:
+                async with websockets.connect(url, additional_headers=headers) as ws:
+                    await ws.send(json.dumps(subscribe))
+                    delay = 1
+                    await self._consume(ws, handle, subscriptions)
+            except (OSError, websockets.WebSocketException) as e:
+                logger.warning("%s feed disconnected: %r; retrying in %ss", name, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+
+    async def _consume(self, ws, handle, subscriptions):
+        """Reads ticks until the tracked pairs change, then returns so the caller resubscribes."""
+        next_check = time.monotonic() + RESUBSCRIBE_CHECK_SECONDS
+        while True:
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=max(0.0, next_check - time.monotonic()))
+            except asyncio.TimeoutError:
+                raw = None
+            if raw is not None:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue  # e.g. Polymarket's "PONG"/"INVALID OPERATION" text frames
+                updated = handle(self.book, message)
+                if updated and self.on_update:
+                    self.on_update(updated)
+            if time.monotonic() >= next_check:
+                if self.book.subscriptions() != subscriptions:
+                    return
+                next_check = time.monotonic() + RESUBSCRIBE_CHECK_SECONDS
+
+### Local stand-in feed server ###
+async def _fake_feed_handler(connection, interval: float):
+    """
+    Speaks just enough of both protocols for testing: the path picks the dialect
+    (/kalshi or /polymarket), the first message is the subscription, then prices
+    for every subscribed id random-walk and are pushed every `interval` seconds.
+    """
+    subscription = json.loads(await connection.recv())
+    kalshi = connection.request.path.startswith("/kalshi")
+    ids = subscription["params"]["market_tickers"] if kalshi else subscription["assets_ids"]
+    prices = {i: random.randint(30, 70) for i in ids}  # cents
+    while True:
+        i = random.choice(ids)
+        prices[i] = min(98, max(2, prices[i] + random.randint(-3, 3)))
+        if kalshi:
+            message = {"type": "ticker", "sid": 1, "msg": {
+                "market_ticker": i,
+                "yes_ask_dollars": f"{prices[i] / 100:.4f}",
+                "yes_bid_dollars": f"{(prices[i] - 1) / 100:.4f}",
+                "ts": int(time.time()),
+            }}
+        else:
+            message = [{"event_type": "price_change", "timestamp": str(int(time.time() * 1000)), "price_changes": [{
+                "asset_id": i, "price": f"{prices[i] / 100:.2f}", "side": "SELL",
+                "best_bid": f"{(prices[i] - 1) / 100:.2f}", "best_ask": f"{prices[i] / 100:.2f}",
+            }]}]
+        await connection.send(json.dumps(message))
+        await asyncio.sleep(interval)
+
+async def _serve_fake_client(connection, interval: float):
+    try:
+        await _fake_feed_handler(connection, interval)
+    except websockets.ConnectionClosed:
+        pass
+
+async def run_fake_feed_server(host: str, port: int, interval: float):
+    async with websockets.serve(lambda c: _serve_fake_client(c, interval), host, port):
+        print(f"Fake feeds on ws://{host}:{port}/kalshi and ws://{host}:{port}/polymarket", flush=True)
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Kalshi/Polymarket market-data websockets")
+    parser.add_argument("--fake-server", action="store_true", help="run the stand-in feed server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between ticks")
+    args = parser.parse_args()
+    if args.fake_server:
+        asyncio.run(run_fake_feed_server(args.host, args.port, args.interval))
+    else:
+        parser.print_help()
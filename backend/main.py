@@ -1,99 +1,205 @@
-from fastapi import FastAPI, Depends, Query
+from fastapi import FastAPI, Depends, Query, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from db import get_db
-from models import KalshiMarket, PolymarketMarket, MarketMatchMap, Base
-from typing import List
-from sqlalchemy import or_
+from models import PriceChange, ScanGeneration, create_schema
 from datetime import datetime
 import uvicorn
-from decimal import Decimal
-from fetch_and_sync_markets import fetch_and_sync_and_calculate_profit
+from contextlib import asynccontextmanager
+from scanner import scanner
+from price_book import price_book
+from db import SessionLocal
+from config import LIVE_FEED_ENABLED, HISTORY_ENABLED, ALERTS_ENABLED
+from live_feed import LiveFeed
+from opportunity_stream import opportunity_stream
+from history_store import history_store
+from alerts import Alerter
+from opportunities import read_opportunities
+import metrics
+from typing import Optional
+import asyncio
+import json
 
-app = FastAPI()
+# Every price book swap (scan or live tick) is diffed into the SSE stream
+price_book.add_listener(opportunity_stream.on_snapshot)
+alerter = Alerter() if ALERTS_ENABLED else None
 
-# Initially create all tables (in production, use migrations instead!)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve the last persisted scan until the scanner publishes a fresh one
+    with SessionLocal() as db:
+        price_book.load_from_db(db)
+    if alerter:
+        # ...and checked against the alert thresholds, from the first fresh price on
+        price_book.add_listener(alerter.on_snapshot)
+        alerter.start()
+    # Scans run on the background scanner, never inside a request
+    scanner.start()
+    # Optional streaming ingestion: reprices individual pairs between scans
+    on_update = (lambda pairs: history_store.record_live(price_book.observations(pairs))) if HISTORY_ENABLED else None
+    live_task = asyncio.create_task(LiveFeed(price_book, on_update=on_update).run()) if LIVE_FEED_ENABLED else None
+    yield
+    if live_task:
+        live_task.cancel()
+    scanner.stop()
+    history_store.flush()
+    if alerter:
+        alerter.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Create missing tables and add columns introduced since the database was created
 from db import engine
-Base.metadata.create_all(bind=engine)
+create_schema(engine)
 
 @app.get("/api/refresh-arbitrage")
-def refresh_arbitrage(db: Session = Depends(get_db)):
-    THRESHOLD = -1
-    mappings = db.query(MarketMatchMap).all()
-    stale = (not mappings) or any((m.last_updated is None) or ((datetime.now() - m.last_updated).total_seconds() > THRESHOLD * 60) for m in mappings)
-    if stale:
-        fetch_and_sync_and_calculate_profit(db)
-        # Re-load mappings to count, after update
-        mappings = db.query(MarketMatchMap).all()
+def refresh_arbitrage(league: Optional[str] = Query(None)):
+    # Wakes the background scanner (one league shard with ?league=NBA) and returns immediately with its state
+    if league and league.upper() not in scanner.leagues:
+        raise HTTPException(status_code=400, detail=f"league must be one of {scanner.leagues}")
+    triggered = scanner.request_scan(league.upper() if league else None)
     return {
-        "mappings": mappings,
-        "refreshed": stale,
-        "matched_pairs": len(mappings),
-        "note": "Market data refreshed and symmetrical by team per market."
+        **scanner.status(),
+        "refreshed": triggered,
+        "note": "Scan requested." if triggered else "Scan in progress; rescan queued."
     }
 
+PAGE_SORTS = ("profit_desc", "profit_asc")
+MAX_PAGE_SIZE = 1000
+
+def _page(kind, league, sort, after, limit, min_profit=None):
+    if sort not in PAGE_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {PAGE_SORTS}")
+    try:
+        return price_book.snapshot().page(kind, league=league.upper() if league else None, sort=sort,
+                                          after=after, limit=limit, min_profit=min_profit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+
 @app.get("/api/markets/matches")
-def get_market_matches(db: Session = Depends(get_db)):
-    # Returns market matchings including profit and direction per market/team
-    mappings = db.query(MarketMatchMap).all()
-    result = []
-    for m in mappings:
-        k = m.kalshi_market
-        p = m.polymarket_market
-        result.append({
-            "kalshi": {
-                "ticker": k.ticker,
-                "title": k.title,
-                "team": k.team,
-                "yes_ask_dollars": float(k.yes_ask_dollars),
-                "no_ask_dollars": float(k.no_ask_dollars),
-                "last_updated": k.last_updated,
-            },
-            "polymarket": {
-                "slug": p.slug,
-                "title": p.title,
-                "home_team": p.home_team,
-                "away_team": p.away_team,
-                "home_price": float(p.home_price),
-                "away_price": float(p.away_price),
-                "last_updated": p.last_updated,
-            },
-            "profit": float(m.profit) if m.profit else None,
-            "direction": m.direction,
-            "match_score": float(m.match_score) if m.match_score else None,
-            "league": m.league,
-            "last_updated": m.last_updated
-        })
-    return result
+def get_market_matches(response: Response,
+                       league: Optional[str] = Query(None),
+                       sort: str = Query("profit_desc"),
+                       after: Optional[str] = Query(None),
+                       limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    # Returns market matchings including profit and direction per market/team, from the price book.
+    # Keyset paginated: pass the X-Next-Cursor header back as ?after= for the next page
+    matches, next_cursor = _page("matches", league, sort, after, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return matches
 
 @app.get("/api/arbitrage")
-def get_arbitrage(min_profit: float = Query(0.001), db: Session = Depends(get_db)):
-    # Returns all market matches with profit > min_profit
-    mappings = db.query(MarketMatchMap).filter(MarketMatchMap.profit > Decimal(str(min_profit))).all()
-    opportunities = []
-    for m in mappings:
-        k, p = m.kalshi_market, m.polymarket_market
-        record = {
-            "kalshi_ticker": k.ticker,
-            "polymarket_slug": p.slug,
-            "team": k.team,
-            "profit": float(m.profit) if m.profit else None,
-            "direction": m.direction,
-            "kalshi": {
-                "yes_ask_dollars": float(k.yes_ask_dollars),
-                "no_ask_dollars": float(k.no_ask_dollars),
-                "team": k.team
-            },
-            "polymarket": {
-                "home_team": p.home_team,
-                "away_team": p.away_team,
-                "home_price": float(p.home_price),
-                "away_price": float(p.away_price)
-            },
-            "league": m.league,
-            "last_updated": m.last_updated
-        }
-        opportunities.append(record)
-    return {"arbitrage_opportunities": opportunities}
+def get_arbitrage(response: Response,
+                  min_profit: float = Query(0.001),
+                  league: Optional[str] = Query(None),
+                  sort: str = Query("profit_desc"),
+                  after: Optional[str] = Query(None),
+                  limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    # Returns market matches with profit > min_profit, from the price book, one keyset page at a time
+    opportunities, next_cursor = _page("arbitrage", league, sort, after, limit, min_profit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"arbitrage_opportunities": opportunities, "next_after": next_cursor}
+
+@app.get("/api/opportunities")
+def get_opportunities(response: Response,
+                      min_profit: float = Query(0.001),
+                      league: Optional[str] = Query(None),
+                      after: Optional[str] = Query(None),
+                      limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                      db: Session = Depends(get_db)):
+    # Same records as /api/arbitrage (profit_desc only), read from the last published scans in
+    # the opportunities table; for readers that need the database's view rather than this process'
+    try:
+        opportunities, next_cursor = read_opportunities(db, league.upper() if league else None, min_profit,
+                                                        after, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"arbitrage_opportunities": opportunities, "next_after": next_cursor}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text format: scan stage timings, outbound HTTP latency, market match counters
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+MAX_HISTORY_ROWS = 10000
+
+@app.get("/api/history")
+def get_history(ticker: Optional[str] = Query(None),
+                league: Optional[str] = Query(None),
+                start: Optional[datetime] = Query(None),
+                end: Optional[datetime] = Query(None),
+                min_profit: Optional[float] = Query(None),
+                limit: int = Query(MAX_HISTORY_ROWS, ge=1, le=MAX_HISTORY_ROWS)):
+    # Observed prices/opportunities from the on-disk history store, oldest first, within [start, end)
+    # e.g. ?ticker=KXNBAGAME-25DEC23BKNPHI-BKN&min_profit=0 traces how long that opportunity lasted
+    if not HISTORY_ENABLED:
+        raise HTTPException(status_code=404, detail="History is disabled")
+    return history_store.query(ticker=ticker, league=league.upper() if league else None, start=start, end=end,
+                               min_profit=min_profit, limit=limit)
+
+@app.get("/api/alerts")
+def get_alerts():
+    # Recently delivered opportunity alerts plus observation-to-delivery latency percentiles
+    if not alerter:
+        raise HTTPException(status_code=404, detail="Alerts are disabled")
+    return alerter.status()
+
+MAX_CHANGE_ROWS = 5000
+
+@app.get("/api/changes")
+def get_changes(after: int = Query(0, ge=0),
+                league: Optional[str] = Query(None),
+                limit: int = Query(1000, ge=1, le=MAX_CHANGE_ROWS),
+                db: Session = Depends(get_db)):
+    # Rows the sync upserted/deleted, oldest first, with only the fields that changed.
+    # Poll with ?after=<last id seen>; generations says when each league was last scanned
+    query = db.query(PriceChange).filter(PriceChange.id > after)
+    if league:
+        query = query.filter(PriceChange.league == league.upper())
+    changes = query.order_by(PriceChange.id).limit(limit).all()
+    return {
+        "changes": [{"id": c.id, "changed_at": c.changed_at, "league": c.league, "kind": c.kind, "key": c.key,
+                     "op": c.op, "fields": c.fields} for c in changes],
+        "next_after": changes[-1].id if changes else after,
+        "generations": {g.league: {"generation": g.generation, "scanned_at": g.scanned_at,
+                                   "changed_rows": g.changed_rows} for g in db.query(ScanGeneration)},
+    }
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+
+@app.get("/api/arbitrage/stream")
+async def stream_arbitrage(request: Request, since: Optional[int] = Query(None)):
+    # Server-Sent Events: a snapshot on connect, then only added/changed/removed opportunities.
+    # Reconnecting clients resume from Last-Event-ID (sent automatically by EventSource) or ?since=
+    last_event_id = request.headers.get("last-event-id")
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    queue, initial = opportunity_stream.subscribe(since)
+
+    async def events():
+        try:
+            for event in initial:
+                yield _sse(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            opportunity_stream.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
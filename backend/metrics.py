@@ -0,0 +1,143 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+import httpx
+from lib import http_client
+
+logger = logging.getLogger(__name__)
+
+# Prometheus' default latency buckets, extended for whole-scan stages
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = HTTP_BUCKETS + (30, 60, 120, 300)
+
+def _labels_text(names, values) -> str:
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> float
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter'] + \
+               [f'{self.name}{_labels_text(self.labels, key)} {value}' for key, value in items]
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=HTTP_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count], sum
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_labels_text(names, key + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels_text(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_labels_text(self.labels, key)} {cumulative}')
+        return lines
+
+SCAN_STAGE_SECONDS = Histogram('scan_stage_seconds', 'Wall time of each scan stage.', ('stage',), STAGE_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram('http_client_request_seconds', 'Outbound HTTP request latency.',
+                                 ('endpoint', 'status'))
+SCAN_MARKETS = Counter('scan_markets_total', 'Kalshi markets seen by scans, by outcome '
+                       '(matched to Polymarket, skipped as inactive, unmatched).', ('outcome',))
+SCANS = Counter('scans_total', 'Completed scans by result.', ('result',))
+OPPORTUNITY_PUBLISHES = Counter('opportunity_publishes_total',
+                                'Publishes of the opportunities read model by result (ok/error).', ('result',))
+ALERTS = Counter('alerts_total', 'Opportunity alerts by kind (open/close) and result (sent/cooldown/error).',
+                 ('kind', 'result'))
+ALERT_LATENCY_SECONDS = Histogram('alert_latency_seconds', 'Price observation to alert delivery, per sink.',
+                                  ('sink',), STAGE_BUCKETS)
+
+class _ClientEvents:
+    """Renders lib.http_client's own event counts (it doesn't depend on this module)."""
+    name = 'http_client_events_total'
+
+    def render(self) -> list:
+        with http_client._stats_lock:
+            items = sorted(http_client.stats.items())
+        return [f'# HELP {self.name} Outbound HTTP retries, 304 revalidations and rate-limit waits.',
+                f'# TYPE {self.name} counter'] + [f'{self.name}{_labels_text(("event",), (event,))} {value}'
+                                                  for event, value in items]
+
+REGISTRY = (SCAN_STAGE_SECONDS, HTTP_REQUEST_SECONDS, SCAN_MARKETS, SCANS, OPPORTUNITY_PUBLISHES, ALERTS,
+            ALERT_LATENCY_SECONDS, _ClientEvents())
+
+def render() -> str:
+    """The registry in Prometheus text exposition format (version 0.0.4)."""
+    return '\n'.join(line for metric in REGISTRY for line in metric.render()) + '\n'
+
+@contextmanager
+def span(stage: str, **fields):
+    """Times a scan stage into scan_stage_seconds and logs it as one key=value line."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        SCAN_STAGE_SECONDS.observe(seconds, stage=stage)
+        logger.info('span stage=%s seconds=%.4f%s', stage, seconds,
+                    ''.join(f' {k}={v}' for k, v in fields.items()))
+
+# Path segments that carry ids are collapsed so the endpoint label stays low-cardinality
+_ENDPOINT_RULES = (
+    (re.compile(r'/markets/slug/[^/]+$'), '/markets/slug/{slug}'),
+    (re.compile(r'/markets/[^/]+/orderbook$'), '/markets/{ticker}/orderbook'),
+)
+
+def endpoint_label(url: httpx.URL) -> str:
+    path = url.path
+    for pattern, replacement in _ENDPOINT_RULES:
+        path = pattern.sub(replacement, path)
+    return f'{url.host}{path}'
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps an httpx transport and records every request in http_client_request_seconds."""
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint_label(request.url),
+                                         status=status)
+
+    async def aclose(self):
+        await self.transport.aclose()
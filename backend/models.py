@@ -1,9 +1,9 @@
 from decimal import Decimal
-from sqlalchemy import Column, Integer, Float, Numeric, String, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, BigInteger, Float, Numeric, String, ForeignKey, DateTime, JSON, Boolean, Date
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index, Sequence, text
 
 Base = declarative_base()
 
@@ -16,7 +16,7 @@ class KalshiMarket(Base):
     team = Column(String, nullable=False)   # 'home' or 'away' or actual team code
     yes_ask_dollars = Column(Numeric)
     no_ask_dollars = Column(Numeric)
-    last_updated = Column(DateTime, default=datetime.utcnow, index=True)
+    last_updated = Column(DateTime, default=datetime.utcnow, index=True)  # Last scan that changed the row
     match = relationship('MarketMatchMap', back_populates='kalshi_market', uselist=False)
 
 class PolymarketMarket(Base):
@@ -29,6 +29,7 @@ class PolymarketMarket(Base):
     away_team = Column(String, nullable=False)
     home_price = Column(Numeric)  # YES price for home team
     away_price = Column(Numeric)  # YES price for away team
+    token_ids = Column(JSON)  # CLOB token ids [home, away], used to subscribe to the live feed
     last_updated = Column(DateTime, default=datetime.utcnow, index=True)
     match = relationship('MarketMatchMap', back_populates='polymarket_market', uselist=False)
 
@@ -39,11 +40,106 @@ class MarketMatchMap(Base):
     polymarket_market_id = Column(Integer, ForeignKey('polymarket_markets.id'))
     profit = Column(Numeric, default=0)  # Max profit for this matchup
     direction = Column(String)           # e.g., 'YES_Kalshi + NO_Poly' or reverse
-    match_score = Column(Numeric)  # Optional for future use
+    executable_size = Column(Numeric)    # Contracts buyable on both legs at a profit, from book depth
+    executable_profit = Column(Numeric)  # Total profit in dollars at executable_size
+    profit_curve = Column(JSON)          # [[cumulative size, cumulative profit], ...] along the sweep
+    match_score = Column(Numeric)  # 1.0 for deterministic slug matches, fuzzy-match confidence otherwise
+    team_outcome = Column(Integer)  # Which Polymarket outcome (0 home, 1 away) is the Kalshi market's team
     league = Column(String)
     last_updated = Column(DateTime, default=datetime.utcnow, index=True)
     kalshi_market = relationship('KalshiMarket', back_populates='match')
     polymarket_market = relationship('PolymarketMarket', back_populates='match')
-    __table_args__ = (UniqueConstraint('kalshi_market_id', 'polymarket_market_id', name='uix_kalshi_polymarket'),)
+    __table_args__ = (UniqueConstraint('kalshi_market_id', 'polymarket_market_id', name='uix_kalshi_polymarket'),
+                      # Serves profit-ordered / league-filtered reads of opportunities
+                      Index('ix_market_match_map_profit_league', 'profit', 'league'),)
     # Optionally, add metadata, sport, etc.
 
+class SlugResolution(Base):
+    __tablename__ = 'slug_resolutions'
+    slug = Column(String, primary_key=True)
+    found = Column(Boolean, nullable=False)   # False = Polymarket returned 404 for this slug
+    game_date = Column(Date, index=True)      # Entries are dropped once the game is over
+    checked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class ScanGeneration(Base):
+    __tablename__ = 'scan_generations'
+    # Liveness marker: rows are only rewritten when they change, so this says how fresh a league's data is
+    league = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=1)
+    scanned_at = Column(DateTime, nullable=False)
+    changed_rows = Column(Integer, nullable=False, default=0)
+
+class PriceChange(Base):
+    __tablename__ = 'price_changes'
+    # Append-only change log; consumers page by id to receive increments instead of full tables
+    id = Column(BigInteger, primary_key=True)
+    changed_at = Column(DateTime, nullable=False, index=True)
+    league = Column(String, index=True)
+    kind = Column(String, nullable=False)  # 'kalshi', 'polymarket' or 'pair'
+    key = Column(String, nullable=False)   # Kalshi ticker, Polymarket slug, or the pair's Kalshi ticker
+    op = Column(String, nullable=False)    # 'upsert' or 'delete'
+    fields = Column(JSON)                  # Only the fields that changed, with their new values
+
+# Global, so a generation number identifies one league's publish on its own
+OPPORTUNITY_GENERATION = Sequence('opportunity_generation_seq', metadata=Base.metadata)
+
+class Opportunity(Base):
+    __tablename__ = 'opportunities'
+    # Denormalized read model: one row per profitable pair per published generation, pre-joined so
+    # readers never touch the scan tables. Rows of a generation are invisible until its pointer moves.
+    id = Column(BigInteger, primary_key=True)
+    generation = Column(BigInteger, nullable=False)
+    league = Column(String, nullable=False, index=True)
+    kalshi_ticker = Column(String, nullable=False)
+    polymarket_slug = Column(String, nullable=False)
+    team = Column(String)
+    profit = Column(Numeric, nullable=False)
+    direction = Column(String, nullable=False)
+    executable_size = Column(Numeric)
+    executable_profit = Column(Numeric)
+    profit_curve = Column(JSON)
+    match_score = Column(Numeric)
+    yes_ask_dollars = Column(Numeric)
+    no_ask_dollars = Column(Numeric)
+    home_team = Column(String)
+    away_team = Column(String)
+    home_price = Column(Numeric)
+    away_price = Column(Numeric)
+    last_updated = Column(DateTime, nullable=False)
+
+# A league's current opportunities in read order (profit desc, ticker) are one range of this index
+Index('ix_opportunities_generation_profit_ticker', Opportunity.generation, Opportunity.profit.desc(),
+      Opportunity.kalshi_ticker)
+
+class OpportunityPointer(Base):
+    __tablename__ = 'opportunity_pointers'
+    # The published generation of each league; moving it is the atomic swap
+    league = Column(String, primary_key=True)
+    generation = Column(BigInteger, nullable=False)
+    published_at = Column(DateTime, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+
+# Columns and indexes added to tables that already shipped. create_all only creates missing
+# tables, so create_schema adds these to an existing database (each statement is idempotent).
+ADDED_COLUMNS = (
+    ('polymarket_markets', 'token_ids'),
+    ('market_match_map', 'executable_size'),
+    ('market_match_map', 'executable_profit'),
+    ('market_match_map', 'profit_curve'),
+    ('market_match_map', 'team_outcome'),
+)
+ADDED_INDEXES = ('ix_market_match_map_profit_league', 'ix_opportunities_generation_profit_ticker')
+
+def create_schema(engine):
+    """Creates missing tables, then brings existing ones up to date with ADDED_COLUMNS / ADDED_INDEXES."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table_name, column_name in ADDED_COLUMNS:
+            column = Base.metadata.tables[table_name].c[column_name]
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} "
+                              f"{column.type.compile(dialect=engine.dialect)}"))
+        for table in Base.metadata.tables.values():
+            for index in table.indexes:
+                if index.name in ADDED_INDEXES:
+                    index.create(bind=conn, checkfirst=True)
@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models import Opportunity, OpportunityPointer, OPPORTUNITY_GENERATION
+from price_book import encode_cursor, decode_cursor, _float
+
+# Rows per multi-row INSERT, as for the scan tables
+INSERT_CHUNK_SIZE = 1000
+
+def _row(generation: int, k: dict, p: dict, pair: dict) -> dict:
+    return {
+        'generation': generation,
+        'league': pair['league'],
+        'kalshi_ticker': k['ticker'],
+        'polymarket_slug': p['slug'],
+        'team': k['team'],
+        'profit': pair['profit'],
+        'direction': pair['direction'],
+        'executable_size': pair.get('executable_size'),
+        'executable_profit': pair.get('executable_profit'),
+        'profit_curve': pair.get('profit_curve'),
+        'match_score': pair.get('match_score'),
+        'yes_ask_dollars': k['yes_ask_dollars'],
+        'no_ask_dollars': k['no_ask_dollars'],
+        'home_team': p['home_team'],
+        'away_team': p['away_team'],
+        'home_price': p['home_price'],
+        'away_price': p['away_price'],
+        'last_updated': pair['last_updated'],
+    }
+
+def publish_opportunities(db: Session, kalshi_rows: dict, poly_rows: dict, pair_rows: list, leagues) -> int:
+    """
+    Publishes one scan's profitable pairs for `leagues` as a new generation of
+    the opportunities read model, in three short transactions:
+      1. stage: insert the rows under a fresh generation no pointer references yet;
+      2. swap: move every scanned league's pointer to it (one tiny UPDATE);
+      3. clean up: delete those leagues' older, now unreachable generations.
+    A reader's single statement joins through the pointers, so it sees either
+    the whole previous generation or the whole new one. A failure before the
+    swap leaves only unreachable rows, which the next publish deletes.
+    Returns the generation.
+    """
+    leagues = tuple(leagues)
+    generation = db.scalar(select(OPPORTUNITY_GENERATION.next_value()))
+    rows = [_row(generation, kalshi_rows[pair['kalshi_ticker']], poly_rows[pair['slug']], pair)
+            for pair in pair_rows if pair['direction'] and (pair['profit'] or 0) > 0 and pair['league'] in leagues]
+    counts = {league: 0 for league in leagues}
+    for row in rows:
+        counts[row['league']] += 1
+    try:
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.execute(insert(Opportunity), rows[start:start + INSERT_CHUNK_SIZE])
+        db.commit()
+
+        now = datetime.now()
+        stmt = insert(OpportunityPointer).values([
+            {'league': league, 'generation': generation, 'published_at': now, 'rows': count}
+            for league, count in counts.items()])
+        db.execute(stmt.on_conflict_do_update(index_elements=['league'], set_={
+            'generation': stmt.excluded.generation,
+            'published_at': stmt.excluded.published_at,
+            'rows': stmt.excluded.rows,
+        }))
+        db.commit()
+
+        db.execute(delete(Opportunity).where(Opportunity.league.in_(leagues), Opportunity.generation < generation))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return generation
+
+def _record(o: Opportunity) -> dict:
+    """Same shape as price_book.arbitrage_record, so clients can switch between the two."""
+    return {
+        "kalshi_ticker": o.kalshi_ticker,
+        "polymarket_slug": o.polymarket_slug,
+        "team": o.team,
+        "profit": float(o.profit),
+        "direction": o.direction,
+        "executable_size": _float(o.executable_size),
+        "executable_profit": _float(o.executable_profit),
+        "profit_curve": o.profit_curve,
+        "kalshi": {
+            "yes_ask_dollars": _float(o.yes_ask_dollars),
+            "no_ask_dollars": _float(o.no_ask_dollars),
+            "team": o.team
+        },
+        "polymarket": {
+            "home_team": o.home_team,
+            "away_team": o.away_team,
+            "home_price": _float(o.home_price),
+            "away_price": _float(o.away_price)
+        },
+        "league": o.league,
+        "last_updated": o.last_updated
+    }
+
+def read_opportunities(db: Session, league=None, min_profit=None, after=None, limit=1000):
+    """
+    Published opportunities, best first, keyset paged with the price book's
+    cursor format; returns (records, next_cursor or None). Raises ValueError on
+    a malformed cursor.
+    """
+    query = db.query(Opportunity).join(OpportunityPointer, and_(OpportunityPointer.league == Opportunity.league,
+                                                                OpportunityPointer.generation == Opportunity.generation))
+    if league:
+        query = query.filter(OpportunityPointer.league == league)
+    if min_profit is not None:
+        query = query.filter(Opportunity.profit > min_profit)
+    if after:
+        profit, ticker = decode_cursor(after)
+        query = query.filter(or_(Opportunity.profit < profit,
+                                 and_(Opportunity.profit == profit, Opportunity.kalshi_ticker > ticker)))
+    rows = query.order_by(Opportunity.profit.desc(), Opportunity.kalshi_ticker).limit(limit + 1).all()
+    records = [_record(o) for o in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(rows[limit - 1].profit, rows[limit - 1].kalshi_ticker)
+    return records, next_cursor
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from collections import deque
+from config import STREAM_HISTORY_SIZE
+
+def _fingerprint(record: dict):
+    # last_updated moves on every scan; only a price/profit change is worth pushing
+    return (record['profit'], record['direction'],
+            tuple(record['kalshi'].values()), tuple(record['polymarket'].values()))
+
+class OpportunityStream:
+    """
+    Turns successive price book snapshots into sequenced deltas for streaming clients.
+    Every change gets the next sequence number and is kept in a bounded history,
+    so a client that reconnects with its last seen sequence receives just the
+    deltas it missed, or a fresh snapshot if it fell too far behind.
+    Only pairs with a positive profit are streamed.
+    """
+    def __init__(self, history_size: int = STREAM_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._current = {}  # kalshi_ticker -> arbitrage record
+        self._fingerprints = {}
+        self._seq = 0
+        self._version = -1  # Last PriceBookSnapshot.version applied
+        self._history = deque(maxlen=history_size)  # delta events, oldest first
+        self._subscribers = set()  # (event loop, asyncio.Queue)
+
+    def on_snapshot(self, snapshot):
+        """PriceBook listener: diffs the snapshot against the last one and fans out a delta."""
+        latest = {r['kalshi_ticker']: r for r in snapshot.arbitrage if (r['profit'] or 0) > 0}
+        with self._lock:
+            # Listeners run outside the book's lock, so an older snapshot can arrive late
+            if snapshot.version <= self._version:
+                return
+            self._version = snapshot.version
+            fingerprints = {ticker: _fingerprint(r) for ticker, r in latest.items()}
+            added = [r for t, r in latest.items() if t not in self._current]
+            changed = [r for t, r in latest.items()
+                       if t in self._current and fingerprints[t] != self._fingerprints[t]]
+            removed = [t for t in self._current if t not in latest]
+            self._current, self._fingerprints = latest, fingerprints
+            if not (added or changed or removed):
+                return
+            self._seq += 1
+            event = {"seq": self._seq, "type": "delta", "added": added, "changed": changed, "removed": removed}
+            self._history.append(event)
+            for loop, queue in list(self._subscribers):
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+                except RuntimeError:
+                    # Subscriber's loop is gone
+                    self._subscribers.discard((loop, queue))
+
+    def _snapshot_event(self) -> dict:
+        return {"seq": self._seq, "type": "snapshot", "opportunities": list(self._current.values())}
+
+    def subscribe(self, since=None):
+        """
+        Registers the calling event loop. Returns (queue, initial_events): the
+        deltas after `since` when they are still in history, otherwise a snapshot.
+        """
+        queue = asyncio.Queue()
+        with self._lock:
+            if since is not None and since == self._seq:
+                initial = []
+            elif since is not None and self._history and self._history[0]["seq"] <= since + 1 and since < self._seq:
+                initial = [event for event in self._history if event["seq"] > since]
+            else:
+                initial = [self._snapshot_event()]
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue, initial
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+opportunity_stream = OpportunityStream()
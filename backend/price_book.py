@@ -0,0 +1,388 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+from config import PRICE_BOOK_TTL_SECONDS
+from lib.order_book import order_books as default_order_books, executable_fields, EMPTY_SWEEP
+from lib.arbitrage_engine import aligned_prices, price_pair_rows
+
+def _float(value):
+    return float(value) if value is not None else None
+
+def match_record(k: dict, p: dict, pair: dict) -> dict:
+    """Shape served by /api/markets/matches."""
+    return {
+        "kalshi": {
+            "ticker": k['ticker'],
+            "title": k['title'],
+            "team": k['team'],
+            "yes_ask_dollars": _float(k['yes_ask_dollars']),
+            "no_ask_dollars": _float(k['no_ask_dollars']),
+            "last_updated": k['last_updated'],
+        },
+        "polymarket": {
+            "slug": p['slug'],
+            "title": p['title'],
+            "home_team": p['home_team'],
+            "away_team": p['away_team'],
+            "home_price": _float(p['home_price']),
+            "away_price": _float(p['away_price']),
+            "last_updated": p['last_updated'],
+        },
+        "profit": float(pair['profit']) if pair['profit'] else None,
+        "direction": pair['direction'],
+        "executable_size": _float(pair.get('executable_size')),
+        "executable_profit": _float(pair.get('executable_profit')),
+        "profit_curve": pair.get('profit_curve'),
+        "match_score": float(pair['match_score']) if pair.get('match_score') else None,
+        "league": pair['league'],
+        "last_updated": pair['last_updated']
+    }
+
+def arbitrage_record(k: dict, p: dict, pair: dict) -> dict:
+    """Shape served by /api/arbitrage."""
+    return {
+        "kalshi_ticker": k['ticker'],
+        "polymarket_slug": p['slug'],
+        "team": k['team'],
+        "profit": float(pair['profit']) if pair['profit'] else None,
+        "direction": pair['direction'],
+        "executable_size": _float(pair.get('executable_size')),
+        "executable_profit": _float(pair.get('executable_profit')),
+        "profit_curve": pair.get('profit_curve'),
+        "kalshi": {
+            "yes_ask_dollars": _float(k['yes_ask_dollars']),
+            "no_ask_dollars": _float(k['no_ask_dollars']),
+            "team": k['team']
+        },
+        "polymarket": {
+            "home_team": p['home_team'],
+            "away_team": p['away_team'],
+            "home_price": _float(p['home_price']),
+            "away_price": _float(p['away_price'])
+        },
+        "league": pair['league'],
+        "last_updated": pair['last_updated']
+    }
+
+def _decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+def encode_cursor(profit, ticker: str) -> str:
+    # Exact decimal text, so a cursor compares equal to the Numeric profit it came from
+    return f"{_decimal(profit)}|{ticker}"
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor, profit as a Decimal; raises ValueError on a malformed cursor."""
+    profit, ticker = cursor.split('|', 1)
+    try:
+        profit = Decimal(profit)
+    except InvalidOperation:
+        raise ValueError(f"Invalid cursor profit: {profit!r}") from None
+    if not profit.is_finite():
+        raise ValueError(f"Invalid cursor profit: {profit!r}")
+    return profit, ticker
+
+@dataclass(frozen=True)
+class PriceBookSnapshot:
+    """
+    Immutable view of the book at one publish. Readers grab the current snapshot
+    reference and never see a half-applied scan; the records inside are shared
+    between requests and must be treated as read-only.
+
+    Records are ordered by (profit desc, Kalshi ticker asc) and `_pages` holds,
+    per league (None = all), the ascending sort keys (-profit, ticker) next to
+    the matching records so keyset pages are a bisect plus a slice.
+    """
+    version: int = 0
+    published_at: Optional[datetime] = None
+    expires_at: float = float('inf')  # time.monotonic() at which the next entry expires
+    matches: tuple = ()
+    arbitrage: tuple = ()
+    _pages: dict = field(default_factory=dict, repr=False)  # league -> (keys, matches, arbitrage)
+
+    def arbitrage_above(self, min_profit: float) -> list:
+        """All arbitrage records with profit > min_profit, best first."""
+        return self.page('arbitrage', min_profit=min_profit)[0]
+
+    def page(self, kind: str, league: Optional[str] = None, sort: str = 'profit_desc',
+             after: Optional[str] = None, limit: Optional[int] = None, min_profit: Optional[float] = None):
+        """
+        Keyset page over 'matches' or 'arbitrage' records. `after` is the cursor
+        returned for the previous page; returns (records, next_cursor or None).
+        """
+        keys, matches, arbitrage = self._pages.get(league, ((), (), ()))
+        records = matches if kind == 'matches' else arbitrage
+        # profit > min  <=>  -profit < -min, i.e. a prefix of the ascending keys
+        end = len(keys) if min_profit is None else bisect.bisect_left(keys, (-min_profit, ''))
+        cursor = None
+        if after:
+            profit, ticker = decode_cursor(after)
+            cursor = (-profit, ticker)
+
+        if sort == 'profit_asc':
+            stop = min(end, bisect.bisect_left(keys, cursor)) if cursor else end
+            start = 0 if limit is None else max(0, stop - limit)
+            selected = range(stop - 1, start - 1, -1)
+            more = start > 0
+        else:
+            start = bisect.bisect_right(keys, cursor) if cursor else 0
+            stop = end if limit is None else min(end, start + limit)
+            selected = range(start, stop)
+            more = stop < end
+        page = [records[i] for i in selected]
+        next_cursor = None
+        if more and page:
+            last = selected[-1]
+            next_cursor = encode_cursor(-keys[last][0], keys[last][1])
+        return page, next_cursor
+
+class PriceBook:
+    """
+    Process-local cache of the latest Kalshi and Polymarket prices and matched
+    pairs, keyed by Kalshi ticker and Polymarket slug. The scanner publishes
+    each scan into it and the live feed applies individual price ticks; an
+    entry not re-observed within `ttl_seconds` is evicted. API reads are served
+    from an immutable snapshot swapped in atomically. Repricing also sweeps the
+    pair's order books from `order_books` when both legs' books are known.
+    """
+    def __init__(self, ttl_seconds: float = PRICE_BOOK_TTL_SECONDS, order_books=default_order_books):
+        self.ttl_seconds = ttl_seconds
+        self.order_books = order_books
+        self._lock = threading.Lock()
+        # key -> (expires_at, row)
+        self._kalshi = {}
+        self._polymarket = {}
+        self._pairs = {}  # keyed by Kalshi ticker; one pair per Kalshi market
+        # Indexes used to find the pairs a price tick touches
+        self._pairs_by_slug = {}  # slug -> {kalshi_ticker}
+        self._tokens = {}         # CLOB token id -> (slug, outcome index)
+        self._records = {}        # kalshi_ticker -> (match_record, arbitrage_record)
+        self._snapshot = PriceBookSnapshot()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registers callback(snapshot), invoked after every snapshot swap outside the book's lock."""
+        self._listeners.append(callback)
+
+    def _notify(self, snapshot):
+        for callback in self._listeners:
+            callback(snapshot)
+
+    def publish(self, kalshi_rows: dict, poly_rows: dict, pair_rows: list, leagues=None):
+        """
+        Merges one scan's rows (as built by fetch_and_sync_markets) and swaps in a
+        new snapshot. When the scan covered `leagues`, entries of those leagues
+        that it no longer saw are dropped right away instead of waiting for the TTL.
+        """
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            if leagues is not None:
+                self._expire_unseen(set(leagues), kalshi_rows, poly_rows, {p['kalshi_ticker'] for p in pair_rows})
+            for ticker, row in kalshi_rows.items():
+                self._kalshi[ticker] = (expires_at, row)
+            for slug, row in poly_rows.items():
+                self._polymarket[slug] = (expires_at, row)
+                for i, token_id in enumerate(row.get('token_ids') or ()):
+                    self._tokens[token_id] = (slug, i)
+            for pair in pair_rows:
+                self._set_pair(pair, expires_at)
+            self._rebuild(dirty=None)
+            snapshot = self._snapshot
+            tickers, token_ids = set(self._kalshi), set(self._tokens)
+        self.order_books.retain(tickers, token_ids)
+        self._notify(snapshot)
+
+    def _expire_unseen(self, leagues: set, kalshi_rows: dict, poly_rows: dict, pair_tickers: set):
+        # Marked expired so the next _rebuild evicts them along with their indexes and records
+        for entries, seen in ((self._kalshi, kalshi_rows), (self._polymarket, poly_rows), (self._pairs, pair_tickers)):
+            for key, (_, row) in list(entries.items()):
+                if row.get('league') in leagues and key not in seen:
+                    entries[key] = (0, row)
+
+    def apply_kalshi_quote(self, ticker: str, yes_ask: Optional[Decimal], no_ask: Optional[Decimal]) -> list:
+        """Applies a live Kalshi top-of-book update and reprices only the pair on that market."""
+        with self._lock:
+            entry = self._kalshi.get(ticker)
+            if entry is None:
+                return []
+            row = {**entry[1], 'yes_ask_dollars': yes_ask, 'no_ask_dollars': no_ask, 'last_updated': datetime.now()}
+            self._kalshi[ticker] = (time.monotonic() + self.ttl_seconds, row)
+            updated = self._reprice([ticker] if ticker in self._pairs else [])
+            snapshot = self._snapshot
+        if updated:
+            self._notify(snapshot)
+        return updated
+
+    def apply_polymarket_price(self, token_id: str, price: Decimal) -> list:
+        """Applies a live price for one Polymarket outcome token and reprices the pairs on its game."""
+        with self._lock:
+            located = self._tokens.get(token_id)
+            entry = located and self._polymarket.get(located[0])
+            if not entry:
+                return []
+            slug, outcome_index = located
+            price_field = 'home_price' if outcome_index == 0 else 'away_price'
+            row = {**entry[1], price_field: price, 'last_updated': datetime.now()}
+            self._polymarket[slug] = (time.monotonic() + self.ttl_seconds, row)
+            updated = self._reprice(list(self._pairs_by_slug.get(slug, ())))
+            snapshot = self._snapshot
+        if updated:
+            self._notify(snapshot)
+        return updated
+
+    def observations(self, pairs: list) -> list:
+        """(kalshi_row, poly_row, pair) for repriced pairs still in the book, for the history store."""
+        with self._lock:
+            found = []
+            for pair in pairs:
+                k = self._kalshi.get(pair['kalshi_ticker'])
+                p = self._polymarket.get(pair['slug'])
+                if k is not None and p is not None:
+                    found.append((k[1], p[1], pair))
+            return found
+
+    def subscriptions(self):
+        """(Kalshi tickers, Polymarket token ids) of every live pair, for the streaming feeds."""
+        with self._lock:
+            tickers = sorted(self._pairs)
+            slugs = {pair['slug'] for _, pair in self._pairs.values()}
+            token_ids = sorted(t for t, (slug, _) in self._tokens.items() if slug in slugs)
+            return tickers, token_ids
+
+    def _set_pair(self, pair: dict, expires_at: float):
+        previous = self._pairs.get(pair['kalshi_ticker'])
+        if previous and previous[1]['slug'] != pair['slug']:
+            self._pairs_by_slug.get(previous[1]['slug'], set()).discard(pair['kalshi_ticker'])
+        self._pairs[pair['kalshi_ticker']] = (expires_at, pair)
+        self._pairs_by_slug.setdefault(pair['slug'], set()).add(pair['kalshi_ticker'])
+
+    def _reprice(self, tickers: list) -> list:
+        """
+        Recomputes arbitrage for the given pairs and rebuilds only their records.
+        Prices are aligned by each pair's stored team_outcome, exactly as the scan
+        priced them, so pairs on teams the dictionary doesn't know stay correct.
+        Caller holds the lock.
+        """
+        now = datetime.now()
+        updated, prices, teams, poly = [], [], [], []
+        for ticker in tickers:
+            expires_at, pair = self._pairs[ticker]
+            k = self._kalshi.get(ticker)
+            p = self._polymarket.get(pair['slug'])
+            if k is None or p is None:
+                continue
+            updated.append({**pair, 'last_updated': now})
+            prices.append(aligned_prices(k[1], p[1], pair['team_outcome']))
+            teams.append(k[1]['team'])
+            poly.append(p[1])
+        price_pair_rows(updated, prices, teams)
+        for pair, p_row in zip(updated, poly):
+            pair.update(executable_fields(self.order_books.executable(pair, p_row) if pair['direction'] else EMPTY_SWEEP))
+            self._pairs[pair['kalshi_ticker']] = (self._pairs[pair['kalshi_ticker']][0], pair)
+        if updated:
+            self._rebuild(dirty=[pair['kalshi_ticker'] for pair in updated])
+        return updated
+
+    def snapshot(self) -> PriceBookSnapshot:
+        snap = self._snapshot
+        if time.monotonic() < snap.expires_at:
+            return snap
+        # Something expired since the last publish; drop it before serving
+        with self._lock:
+            expired = time.monotonic() >= self._snapshot.expires_at
+            if expired:
+                self._rebuild(dirty=())
+            snap = self._snapshot
+        if expired:
+            self._notify(snap)
+        return snap
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for entries in (self._kalshi, self._polymarket, self._pairs):
+            for key in [key for key, (expires_at, _) in entries.items() if expires_at <= now]:
+                del entries[key]
+        for key in [key for key in self._records
+                    if key not in self._pairs or key not in self._kalshi
+                    or self._pairs[key][1]['slug'] not in self._polymarket]:
+            del self._records[key]
+        for slug, tickers in list(self._pairs_by_slug.items()):
+            tickers.intersection_update(self._pairs)
+            if not tickers:
+                del self._pairs_by_slug[slug]
+        for token_id in [t for t, (slug, _) in self._tokens.items() if slug not in self._polymarket]:
+            del self._tokens[token_id]
+
+    def _rebuild(self, dirty):
+        """Rebuilds records for `dirty` pair keys (all when None) and swaps in a new snapshot."""
+        self._evict_expired()
+        for ticker in (self._pairs if dirty is None else dirty):
+            if ticker not in self._pairs:
+                continue
+            pair = self._pairs[ticker][1]
+            k = self._kalshi.get(ticker)
+            p = self._polymarket.get(pair['slug'])
+            if k is None or p is None:
+                self._records.pop(ticker, None)
+                continue
+            self._records[ticker] = (match_record(k[1], p[1], pair), arbitrage_record(k[1], p[1], pair))
+
+        next_expiry = float('inf')
+        rows = []
+        for ticker, (match, arb) in self._records.items():
+            pair = self._pairs[ticker][1]
+            next_expiry = min(next_expiry, self._pairs[ticker][0], self._kalshi[ticker][0],
+                              self._polymarket[pair['slug']][0])
+            rows.append(((-_decimal(pair['profit']), ticker), pair['league'], match, arb))
+        rows.sort(key=lambda row: row[0])
+
+        pages = {None: rows}
+        for row in rows:
+            pages.setdefault(row[1], []).append(row)
+        pages = {league: (tuple(r[0] for r in league_rows), tuple(r[2] for r in league_rows),
+                          tuple(r[3] for r in league_rows))
+                 for league, league_rows in pages.items()}
+
+        self._snapshot = PriceBookSnapshot(
+            version=self._snapshot.version + 1,
+            published_at=datetime.now(),
+            expires_at=next_expiry,
+            matches=pages[None][1],
+            arbitrage=pages[None][2],
+            _pages=pages,
+        )
+
+    def load_from_db(self, db):
+        """Seeds the book from Postgres so reads are served before the first scan finishes."""
+        from models import KalshiMarket, PolymarketMarket, MarketMatchMap
+        from sqlalchemy.orm import contains_eager
+        from lib.team_resolver import is_same_team
+        kalshi_rows, poly_rows, pair_rows = {}, {}, []
+        # One joined SELECT; contains_eager fills both relationships from it, so no lazy loads per row
+        mappings = (db.query(MarketMatchMap)
+                    .join(MarketMatchMap.kalshi_market)
+                    .join(MarketMatchMap.polymarket_market)
+                    .options(contains_eager(MarketMatchMap.kalshi_market),
+                             contains_eager(MarketMatchMap.polymarket_market))
+                    .all())
+        for m in mappings:
+            k, p = m.kalshi_market, m.polymarket_market
+            kalshi_rows[k.ticker] = {c: getattr(k, c) for c in
+                                     ('ticker', 'title', 'team', 'yes_ask_dollars', 'no_ask_dollars', 'last_updated', 'league')}
+            poly_rows[p.slug] = {c: getattr(p, c) for c in
+                                 ('slug', 'title', 'home_team', 'away_team', 'home_price', 'away_price', 'token_ids',
+                                  'last_updated', 'league')}
+            pair_rows.append({'kalshi_ticker': k.ticker, 'slug': p.slug, 'league': m.league, 'profit': m.profit,
+                              'direction': m.direction, 'match_score': m.match_score, 'last_updated': m.last_updated,
+                              'executable_size': m.executable_size, 'executable_profit': m.executable_profit,
+                              'profit_curve': m.profit_curve,
+                              # Rows written before team_outcome was stored fall back to the dictionary
+                              'team_outcome': m.team_outcome if m.team_outcome is not None
+                              else 0 if is_same_team(k.team, p.home_team, m.league) else 1})
+        self.publish(kalshi_rows, poly_rows, pair_rows)
+
+price_book = PriceBook()
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from config import (SCAN_INTERVAL_SECONDS, HISTORY_ENABLED, LEAGUE_SCAN_INTERVAL_SECONDS, SCAN_SHARD_WORKERS)
+from db import SessionLocal
+from fetch_and_sync_markets import fetch_and_sync_and_calculate_profit, LEAGUES
+from price_book import price_book as default_price_book
+from history_store import history_store as default_history_store
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class _Shard:
+    """Scan state of one league."""
+    def __init__(self, league: str, interval_seconds: float):
+        self.league = league
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()  # Held while the shard scans
+        self.next_due = 0.0           # time.monotonic() of the next scheduled pass; inf while queued
+        self.rerun = False            # Requested while running: scan again as soon as it finishes
+        self.scan_id = 0
+        self.started_at = None
+        self.duration_seconds = None
+        self.matched_pairs = None
+        self.last_error = None
+
+    def status(self) -> dict:
+        return {
+            "scan_id": self.scan_id,
+            "running": self.lock.locked(),
+            "started_at": self.started_at,
+            "duration_seconds": self.duration_seconds,
+            "matched_pairs": self.matched_pairs,
+            "last_error": self.last_error,
+            "interval_seconds": self.interval_seconds,
+        }
+
+class Scanner:
+    """
+    Background scanner sharded by league. Each league is rescanned
+    `interval_seconds` after its previous pass finished (LEAGUE_SCAN_INTERVAL_SECONDS
+    overrides that per league), and due shards run in parallel on a thread pool,
+    so a hot league can refresh far more often than off-season ones.
+    A non-blocking lock per shard makes each shard single-flight: a scan requested
+    while it is running is folded into a pass right after it finishes.
+    Each successful shard scan is published to the in-memory price book (replacing
+    only that league) and, when a history store is set, appended to it.
+    """
+    def __init__(self, interval_seconds: float = SCAN_INTERVAL_SECONDS, session_factory=SessionLocal,
+                 price_book=default_price_book,
+                 history=default_history_store if HISTORY_ENABLED else None,
+                 leagues=LEAGUES, league_intervals=LEAGUE_SCAN_INTERVAL_SECONDS, workers: int = SCAN_SHARD_WORKERS):
+        self.interval_seconds = interval_seconds
+        self.session_factory = session_factory
+        self.price_book = price_book
+        self.history = history
+        self.workers = workers
+        self.shards = {league: _Shard(league, float(league_intervals.get(league, interval_seconds)))
+                       for league in leagues}
+        self._state_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+
+    @property
+    def leagues(self) -> tuple:
+        return tuple(self.shards)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sentinel-shard")
+        self._thread = threading.Thread(target=self._loop, name="sentinel-scanner", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def request_scan(self, league: Optional[str] = None) -> bool:
+        """
+        Nudges one league shard (every shard when None) to scan now. Returns False
+        if every requested shard is already running; those rescan once they finish.
+        """
+        shards = [self.shards[league]] if league else list(self.shards.values())
+        triggered = False
+        with self._state_lock:
+            for shard in shards:
+                if shard.lock.locked():
+                    shard.rerun = True
+                else:
+                    if shard.next_due != float('inf'):  # inf: already queued on the pool
+                        shard.next_due = 0.0
+                    triggered = True
+        self._wake.set()
+        return triggered
+
+    def run_once(self, leagues=None) -> bool:
+        """Scans the given leagues (all when None) in parallel and waits; False if any shard was already running."""
+        leagues = list(leagues or self.shards)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return all(pool.map(self.run_shard, leagues))
+
+    def run_shard(self, league: str) -> bool:
+        """Runs one league's scan in the calling thread unless that shard is in flight."""
+        shard = self.shards[league]
+        if not shard.lock.acquire(blocking=False):
+            return False
+        try:
+            with self._state_lock:
+                shard.scan_id += 1
+                shard.started_at = datetime.now()
+                shard.duration_seconds = None
+            start = time.perf_counter()
+            db = self.session_factory()
+            try:
+                result = fetch_and_sync_and_calculate_profit(db, [league])
+                self.price_book.publish(result.kalshi_rows, result.poly_rows, result.pair_rows, result.leagues)
+                if self.history:
+                    self.history.record_scan(result.kalshi_rows, result.poly_rows, result.pair_rows)
+                matched_pairs = len(result.pair_rows)
+                error = None
+                metrics.SCANS.inc(result='ok')
+            except Exception as e:
+                matched_pairs = None
+                error = repr(e)
+                metrics.SCANS.inc(result='error')
+                logger.exception("Scan %s of %s failed", shard.scan_id, league)
+            finally:
+                db.close()
+            with self._state_lock:
+                shard.duration_seconds = time.perf_counter() - start
+                shard.last_error = error
+                if matched_pairs is not None:
+                    shard.matched_pairs = matched_pairs
+            return True
+        finally:
+            with self._state_lock:
+                shard.next_due = 0.0 if shard.rerun else time.monotonic() + shard.interval_seconds
+                shard.rerun = False
+            shard.lock.release()
+            self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            with self._state_lock:
+                due = [s for s in self.shards.values() if s.next_due <= now and not s.lock.locked()]
+                for shard in due:
+                    shard.next_due = float('inf')  # Rescheduled by run_shard when it finishes
+            for shard in due:
+                self._pool.submit(self.run_shard, shard.league)
+            with self._state_lock:
+                next_due = min(s.next_due for s in self.shards.values())
+            self._wake.wait(max(0.0, next_due - time.monotonic()) if next_due != float('inf') else None)
+
+    def status(self) -> dict:
+        """Aggregate state across shards (latest start, summed pairs, first error) plus each shard's own."""
+        with self._state_lock:
+            shards = {league: shard.status() for league, shard in self.shards.items()}
+        started = [s for s in shards.values() if s["started_at"]]
+        latest = max(started, key=lambda s: s["started_at"]) if started else None
+        matched = [s["matched_pairs"] for s in shards.values() if s["matched_pairs"] is not None]
+        return {
+            "scan_id": sum(s["scan_id"] for s in shards.values()),
+            "running": any(s["running"] for s in shards.values()),
+            "started_at": latest["started_at"] if latest else None,
+            "duration_seconds": latest["duration_seconds"] if latest else None,
+            "matched_pairs": sum(matched) if matched else None,
+            "last_error": next((s["last_error"] for s in shards.values() if s["last_error"]), None),
+            "interval_seconds": self.interval_seconds,
+            "shards": shards,
+        }
+
+scanner = Scanner()
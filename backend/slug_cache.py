@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from config import SLUG_HIT_TTL_SECONDS, SLUG_MISS_TTL_SECONDS, SLUG_CACHE_SIZE
+from models import SlugResolution
+
+UPSERT_CHUNK_SIZE = 1000  # Rows per multi-row upsert, as for the scan tables
+
+class SlugCache:
+    """
+    Remembers whether a guessed Polymarket slug exists, so games with no
+    Polymarket counterpart aren't re-requested every scan. Hits and misses have
+    separate TTLs; entries are dropped once their game date has passed.
+    An in-memory LRU answers lookups; the slug_resolutions table keeps the
+    entries across restarts and is read once and written once per scan.
+    """
+    def __init__(self, hit_ttl_seconds: float = SLUG_HIT_TTL_SECONDS,
+                 miss_ttl_seconds: float = SLUG_MISS_TTL_SECONDS, capacity: int = SLUG_CACHE_SIZE):
+        self.hit_ttl = timedelta(seconds=hit_ttl_seconds)
+        self.miss_ttl = timedelta(seconds=miss_ttl_seconds)
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Held across load()'s DB round trips, so shards load once
+        self._entries = OrderedDict()  # slug -> (found, expires_at, game_date)
+        self._dirty = {}               # slug -> row awaiting flush
+        self._loaded = False
+
+    def lookup(self, slug: str) -> Optional[bool]:
+        """True/False for a live cached hit/miss, None when unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is None:
+                return None
+            found, expires_at, _ = entry
+            if expires_at <= datetime.now():
+                del self._entries[slug]
+                return None
+            self._entries.move_to_end(slug)
+            return found
+
+    def record(self, slug: str, found: bool, game_date: Optional[date] = None):
+        now = datetime.now()
+        expires_at = now + (self.hit_ttl if found else self.miss_ttl)
+        with self._lock:
+            self._entries[slug] = (found, expires_at, game_date)
+            self._entries.move_to_end(slug)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._dirty[slug] = {'slug': slug, 'found': found, 'game_date': game_date,
+                                 'checked_at': now, 'expires_at': expires_at}
+
+    def clear(self):
+        """Forgets every entry and pending write; the next load() re-reads the table."""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = {}
+            self._loaded = False
+
+    def load(self, db: Session):
+        """
+        Drops finished/expired rows and warms the LRU from the table; only the
+        first call hits the DB, and concurrent first calls wait for it.
+        """
+        with self._load_lock:
+            with self._lock:
+                if self._loaded:
+                    return
+            now = datetime.now()
+            db.query(SlugResolution).filter(
+                (SlugResolution.game_date < date.today()) | (SlugResolution.expires_at <= now)
+            ).delete(synchronize_session=False)
+            db.commit()
+            rows = (db.query(SlugResolution.slug, SlugResolution.found, SlugResolution.expires_at,
+                             SlugResolution.game_date)
+                    .order_by(SlugResolution.checked_at.desc()).limit(self.capacity).all())
+            with self._lock:
+                # Newest checks last, so they are the most recently used entries
+                for slug, found, expires_at, game_date in reversed(rows):
+                    self._entries.setdefault(slug, (found, expires_at, game_date))
+                self._loaded = True
+
+    def flush(self, db: Session):
+        """Writes everything recorded since the last flush in chunked multi-row upserts and evicts finished games."""
+        with self._lock:
+            rows, self._dirty = list(self._dirty.values()), {}
+            today = date.today()
+            for slug in [s for s, (_, _, game_date) in self._entries.items() if game_date and game_date < today]:
+                del self._entries[slug]
+        if not rows:
+            return
+        try:
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                stmt = insert(SlugResolution).values(rows[start:start + UPSERT_CHUNK_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['slug'],
+                    set_={col: stmt.excluded[col] for col in ('found', 'game_date', 'checked_at', 'expires_at')}
+                )
+                db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep the rows for the next flush
+            with self._lock:
+                for row in rows:
+                    self._dirty.setdefault(row['slug'], row)
+            raise
+
+slug_cache = SlugCache()
@@ -0,0 +1,65 @@
+import threading
+from decimal import Decimal
+
+# Fields whose change makes a row worth rewriting; last_updated is deliberately not one of them
+TRACKED_FIELDS = {
+    'kalshi': ('title', 'team', 'yes_ask_dollars', 'no_ask_dollars', 'league'),
+    'polymarket': ('title', 'home_team', 'away_team', 'home_price', 'away_price', 'token_ids', 'league'),
+    'pair': ('slug', 'league', 'profit', 'direction', 'match_score', 'team_outcome', 'executable_size',
+             'executable_profit', 'profit_curve'),
+}
+
+def _json_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+class SyncState:
+    """
+    What this process last wrote to Postgres: each row's tracked field values
+    (its fingerprint) and database id, keyed by ticker / slug / Kalshi ticker.
+    The sync diffs every scan against it so unchanged rows are not rewritten,
+    and reuses the ids of rows it skipped. It is only updated after a commit,
+    so a rolled-back scan is simply diffed again next time. An empty state (a
+    fresh process) makes every row count as changed.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {kind: {} for kind in TRACKED_FIELDS}  # kind -> key -> field values
+        self._ids = {kind: {} for kind in TRACKED_FIELDS}   # kind -> key -> database id
+
+    def changes(self, kind: str, rows: dict) -> dict:
+        """key -> {field: new value} for every row that is new or differs from what was last written."""
+        fields = TRACKED_FIELDS[kind]
+        changed = {}
+        with self._lock:
+            previous = self._rows[kind]
+            for key, row in rows.items():
+                values = tuple(row.get(f) for f in fields)
+                before = previous.get(key)
+                if before != values:
+                    changed[key] = {f: _json_value(v) for f, v, old in
+                                    zip(fields, values, before or (object(),) * len(fields)) if v != old}
+        return changed
+
+    def ids(self, kind: str) -> dict:
+        with self._lock:
+            return dict(self._ids[kind])
+
+    def clear(self):
+        """Forgets everything, e.g. after the tables were dropped; the next scan rewrites every row."""
+        with self._lock:
+            for kind in TRACKED_FIELDS:
+                self._rows[kind].clear()
+                self._ids[kind].clear()
+
+    def commit(self, kind: str, rows: dict, written: dict, ids: dict = None, removed=()):
+        """Records the rows written (`written` keys), their ids, and forgets `removed` keys."""
+        fields = TRACKED_FIELDS[kind]
+        with self._lock:
+            for key in written:
+                self._rows[kind][key] = tuple(rows[key].get(f) for f in fields)
+            self._ids[kind].update(ids or {})
+            for key in removed:
+                self._rows[kind].pop(key, None)
+                self._ids[kind].pop(key, None)
+
+sync_state = SyncState()
@@ -4,7 +4,7 @@ import ArbTable, { Opportunity } from "@/components/ArbTable";
 import ArbDetailModal from "@/components/ArbDetailModal";
 import ThemeToggle from "@/components/ThemeToggle";
 import ScanButton from "@/components/ScanButton";
-import { fetchOpportunities, refreshArbitrage } from "@/lib/api";
+import { fetchOpportunities, refreshArbitrage, subscribeOpportunities } from "@/lib/api";
 
 export default function Home() {
   const [modalOpen, setModalOpen] = React.useState(false);
@@ -14,9 +14,10 @@ export default function Home() {
   const [refreshing, setRefreshing] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
 
-  // Fetch opportunities on load
+  // Fetch opportunities on load, then keep them current from the live stream
   React.useEffect(() => {
     loadOpportunities();
+    return subscribeOpportunities(setOpportunities);
   }, []);
 
   const loadOpportunities = async () => {
@@ -3,15 +3,9 @@ import type { Opportunity } from "@/components/ArbTable";
 // Use environment variable for API base (frontend proxy or external backend)
 // const API_BASE = process.env.INTERNAL_BACKEND_URL;
 
-// Fetch up-to-date arbitrage opportunities from FastAPI backend
-export async function fetchOpportunities(minProfit = 0.001): Promise<Opportunity[]> {
-  const resp = await fetch(`/api/arbitrage?min_profit=${minProfit}`);
-  if (!resp.ok) {
-    throw new Error("Failed to fetch opportunities");
-  }
-  const data = await resp.json();
-  return (data.arbitrage_opportunities ?? []).map((item: any, idx: number) => ({
-    id: idx.toString(),
+function toOpportunity(item: any, id: string): Opportunity {
+  return {
+    id,
     market: item.direction === "kalshi_to_poly" ? "Kalshi → Poly" : "Poly → Kalshi",
     ticker: `${item.kalshi_ticker} / ${item.polymarket_slug}`,
     price: item.profit ? `$${item.profit.toFixed(4)}` : "-",
@@ -20,8 +14,60 @@ export async function fetchOpportunities(minProfit = 0.001): Promise<Opportunity
     polymarketURL: `https://polymarket.com/markets/${item.polymarket_slug}`,
     kalshiURL: `https://kalshi.com/markets/kx${item.league}game/${item.league}-game/${item.kalshi_ticker.slice(-4)}`.toLowerCase(),
     original: item,
-  })) as Opportunity[];
-} 
+  } as Opportunity;
+}
+
+// Fetch up-to-date arbitrage opportunities from FastAPI backend.
+// The backend pages its results; follow next_after until the last page.
+export async function fetchOpportunities(minProfit = 0.001): Promise<Opportunity[]> {
+  const items: any[] = [];
+  let after: string | null = null;
+  do {
+    const params = new URLSearchParams({ min_profit: String(minProfit) });
+    if (after) params.set("after", after);
+    const resp = await fetch(`/api/arbitrage?${params}`);
+    if (!resp.ok) {
+      throw new Error("Failed to fetch opportunities");
+    }
+    const data = await resp.json();
+    items.push(...(data.arbitrage_opportunities ?? []));
+    after = data.next_after ?? resp.headers.get("X-Next-Cursor");
+  } while (after);
+  return items.map((item: any, idx: number) => toOpportunity(item, idx.toString()));
+}
+
+// Subscribe to live opportunity updates over Server-Sent Events.
+// The backend sends a full snapshot first, then only added/changed/removed entries;
+// EventSource reconnects on its own and resumes from the last sequence number it saw.
+export function subscribeOpportunities(
+  onChange: (opportunities: Opportunity[]) => void,
+  minProfit = 0.001,
+): () => void {
+  const current = new Map<string, any>();
+  const source = new EventSource(`/api/arbitrage/stream`);
+
+  const emit = () => {
+    const items = Array.from(current.values())
+      .filter((item) => (item.profit ?? 0) > minProfit)
+      .sort((a, b) => (b.profit ?? 0) - (a.profit ?? 0));
+    onChange(items.map((item) => toOpportunity(item, item.kalshi_ticker)));
+  };
+
+  source.addEventListener("snapshot", (e) => {
+    const data = JSON.parse((e as MessageEvent).data);
+    current.clear();
+    for (const item of data.opportunities) current.set(item.kalshi_ticker, item);
+    emit();
+  });
+  source.addEventListener("delta", (e) => {
+    const data = JSON.parse((e as MessageEvent).data);
+    for (const item of [...data.added, ...data.changed]) current.set(item.kalshi_ticker, item);
+    for (const ticker of data.removed) current.delete(ticker);
+    emit();
+  });
+
+  return () => source.close();
+}
 
 // Trigger backend data refresh; returns true if refreshed
 export async function refreshArbitrage(): Promise<boolean> {
@@ -1,146 +1,275 @@
-import json
-from lib.kalshi_fetcher import get_open_markets_for_series
-from lib.match_market import MarketMatcher
-import requests
+"""
+Standalone Kalshi/Polymarket arbitrage scout (no database needed).
 
-with open('lib/dictionaries/abbreviations.json', 'r') as f:
-    kalshi_poly_dict = json.load(f)
+Streams every open game market of the chosen series, resolves each game's
+Polymarket market concurrently and writes one JSON line per evaluated pair as
+soon as its game resolves, so output can be piped and an interrupted run keeps
+what it printed. With --watch it rescans every --interval seconds and emits
+only pairs that changed (and {"kalshi_ticker": ..., "removed": true} for pairs
+that dropped out). Progress goes to stderr.
 
-SERIES_TICKERS = ["KXNBAGAME", "KXNFLGAME", "KXNHLGAME", "KXMLBGAME"]
-KALSHI_SIDES = ["yes", "no"]
+    python arbitrage_scout.py --league NBA NHL --min-profit 0.01 > opportunities.jsonl
+    python arbitrage_scout.py --watch --interval 15 | jq .
+    LEAGUE_GAMMA_SPORTS='{"LALIGA": "lal"}' python arbitrage_scout.py --series KXLALIGAGAME --catalog
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+import httpx
+from lib.kalshi_fetcher import stream_open_markets
+from lib.match_market import MarketMatcher, PolymarketCatalog
+from lib.arbitrage_engine import PRICE_SCALE, detect_arbitrage_batch, to_units
+from lib.fuzzy_match import kalshi_league, outcome_index
+from lib.team_resolver import is_same_team, parse_ticker
+from lib.http_client import async_client
 
-def fetch_polymarket_prices(slug):
-    resp = requests.get(f"https://gamma-api.polymarket.com/markets/slug/{slug}")
-    if resp.status_code != 200:
-        print(f"Error fetching Polymarket prices for {slug}: {resp.status_code}"    )   
-        return None, None
+SERIES_BY_LEAGUE = {"NBA": ["KXNBAGAME"], "NFL": ["KXNFLGAME"], "NHL": ["KXNHLGAME"], "MLB": ["KXMLBGAME"]}
+SERIES_TICKERS = [series for tickers in SERIES_BY_LEAGUE.values() for series in tickers]
+DEFAULT_CONCURRENCY = 16
+DEFAULT_WATCH_INTERVAL = 30
 
-    data = resp.json()
+def polymarket_prices(market):
+    """(outcomes, [float prices]) of a matched PolymarketMarketRecord, or (None, None) if it has none."""
     try:
-
         # outcomes = ["Home", "Away"]
         # prices = [home_price, away_price] = [Home Yes, Away Yes] = [Away No, Home No]
-        outcomes = json.loads(data["outcomes"]) if isinstance(data["outcomes"], str) else data["outcomes"]
-        prices = json.loads(data["outcomePrices"]) if isinstance(data["outcomePrices"], str) else data["outcomePrices"]
-        return outcomes, [float(p) for p in prices]
-    except Exception:
+        outcomes, prices = list(market.outcomes), [float(p) for p in market.outcome_prices]
+    except (TypeError, ValueError):
         return None, None
+    return (outcomes, prices) if outcomes and len(prices) == len(outcomes) else (None, None)
 
-def detect_arbitrage(kalshi_market, polymarket_slug, outcomes, poly_prices):
+def detect_arbitrage(items, team_outcomes=None):
     """
-    kalshi_market: The dict for a specific ticker (e.g., ...DETSAC-DET)
-    outcomes: List of teams from Polymarket (e.g., ["Pistons", "Kings"])
-    poly_prices: List of prices (e.g., [0.45, 0.55])
+    Prices every scanned pair in one vectorized pass (lib.arbitrage_engine) and
+    fills each item's "arbitrage_opportunities".
+    items: dicts holding "kalshi_ticker", "kalshi_yes"/"kalshi_no", "outcomes"
+    (e.g. ["Pistons", "Kings"]) and "polymarket_prices" (e.g. [0.45, 0.55]).
+    team_outcomes: kalshi_ticker -> index of its team among the outcomes, for
+    tickers the team dictionary can't parse (fuzzy matches).
     """
-    kalshi_ticker = kalshi_market.get("ticker", "")
-    league = kalshi_ticker[2:5]
-    # Extract the team code from the end of the Kalshi ticker (e.g., 'DET')
-    kalshi_team_code = kalshi_ticker.split('-')[-1] 
+    team_outcomes = team_outcomes or {}
+    rows = []  # (item, kalshi_team_code, outcome_name, kalshi_yes, kalshi_no, poly_yes)
+    for item in items:
+        item["arbitrage_opportunities"] = []
+        ticker = item["kalshi_ticker"]
+        info = parse_ticker(ticker)
+        if not info and ticker not in team_outcomes:
+            continue
+        # League and the team code at the end of the Kalshi ticker (e.g., 'DET')
+        league, kalshi_team_code = (info.league, info.team) if info else (item["league"], ticker.split('-')[-1])
+        for i, outcome_name in enumerate(item["outcomes"]):
+            # Only compare the SAME team on both platforms ('DET' on Kalshi is 'Pistons' on Polymarket)
+            if not (is_same_team(kalshi_team_code, outcome_name, league) if info else i == team_outcomes[ticker]):
+                continue
+            # A zero/missing Kalshi quote means that side can't be bought
+            kalshi_yes = item["kalshi_yes"] if float(item["kalshi_yes"] or 0) > 0 else None
+            kalshi_no = item["kalshi_no"] if float(item["kalshi_no"] or 0) > 0 else None
+            rows.append((item, kalshi_team_code, outcome_name, kalshi_yes, kalshi_no,
+                         item["polymarket_prices"][i]))
+    if not rows:
+        return items
 
-    kalshi_yes = float(kalshi_market.get("yes_ask_dollars") or 0)
-    kalshi_no = float(kalshi_market.get("no_ask_dollars") or 0)
+    kalshi_yes = to_units([r[3] for r in rows])
+    kalshi_no = to_units([r[4] for r in rows])
+    poly_yes = to_units([r[5] for r in rows])
+    # NO on Polymarket is priced as the complement of the team's YES
+    poly_no = PRICE_SCALE - poly_yes
+    result = detect_arbitrage_batch(kalshi_yes, kalshi_no, poly_yes, poly_no)
 
-    arbitrage_cases = []
+    for i, (item, kalshi_team_code, outcome_name, *_) in enumerate(rows):
+        # Case 1: Buy Team A 'YES' on Kalshi, 'NO' (against Team A) on Polymarket
+        if result.yes_kalshi_profit[i] > 0:
+            item["arbitrage_opportunities"].append({
+                "type": f"YES_Kalshi_{kalshi_team_code} + NO_Poly_{outcome_name}",
+                "outcome": outcome_name,
+                "cost": float(result.yes_kalshi_cost[i]),
+                "profit": float(result.yes_kalshi_profit[i])
+            })
+        # Case 2: Buy Team A 'YES' on Polymarket, 'NO' on Kalshi
+        if result.yes_poly_profit[i] > 0:
+            item["arbitrage_opportunities"].append({
+                "type": f"YES_Poly_{outcome_name} + NO_Kalshi_{kalshi_team_code}",
+                "outcome": outcome_name,
+                "cost": float(result.yes_poly_cost[i]),
+                "profit": float(result.yes_poly_profit[i])
+            })
+    return items
 
-    for i, outcome_name in enumerate(outcomes):
-        # IMPORTANT: Use your matcher or a simple helper to see if 
-        # 'DET' (Kalshi) matches 'Pistons' (Polymarket)
-        if not is_same_team(kalshi_team_code, outcome_name, league):
-            continue
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
 
-        # If we are here, we are looking at the SAME team on both platforms
-        poly_yes = poly_prices[i]
-        poly_no = 1 - poly_yes
+def _best_profit(item):
+    return max((arb["profit"] for arb in item["arbitrage_opportunities"]), default=None)
 
-        # Case 1: Buy Team A 'YES' on Kalshi, 'NO' (against Team A) on Polymarket
-        if kalshi_yes > 0:
-            total_spent = kalshi_yes + poly_no
-            if total_spent < 1: # Use 0.98 to account for slippage/fees
-                arbitrage_cases.append({
-                    "type": f"YES_Kalshi_{kalshi_team_code} + NO_Poly_{outcome_name}",
-                    "outcome": outcome_name,
-                    "cost": total_spent,
-                    "profit": 1 - total_spent
-                })
+def _fingerprint(item):
+    # observed_at moves on every pass; only prices/opportunities make a pair "changed"
+    return (tuple(item["polymarket_prices"]), item["kalshi_yes"], item["kalshi_no"],
+            tuple((arb["type"], arb["profit"]) for arb in item["arbitrage_opportunities"]))
 
+def _wanted(item, min_profit):
+    if min_profit is None:
+        return True
+    best = _best_profit(item)
+    # Strictly above, like /api/arbitrage?min_profit=
+    return best is not None and best > min_profit
 
-        # Case 2: Buy Team A 'YES' on Polymarket, 'NO' on Kalshi
-        if kalshi_no > 0:
-            total_spent = poly_yes + kalshi_no
-            if total_spent < 1:
-                arbitrage_cases.append({
-                    "type": f"YES_Poly_{outcome_name} + NO_Kalshi_{kalshi_team_code}",
-                    "outcome": outcome_name,
-                    "cost": total_spent,
-                    "profit": 1 - total_spent
-                })
-                
-    return arbitrage_cases
-
-def is_same_team(kalshi_team_code, outcome_name, league):
-    return kalshi_poly_dict[league][kalshi_team_code]['name'] == outcome_name
-
-def main():
-    matcher = MarketMatcher()
-    all_kalshi_markets = []
-
-    print("Fetching all open team-vs-team markets from NBA, NFL, NHL, MLB...")
-    for series_ticker in SERIES_TICKERS:
-        markets = get_open_markets_for_series(series_ticker)
-        for market in markets:
-            if matcher._exact_match_sports_slug(market.get("ticker", "")):
-                all_kalshi_markets.append(market)
-
-    print(f"Found {len(all_kalshi_markets)} team-vs-team markets.\n")
-    results = []
-    for kalshi_market in all_kalshi_markets:
-        kalshi_ticker = kalshi_market.get("ticker", "?")
-        kalshi_title = kalshi_market.get("title", "?")
-        match = matcher.find_polymarket_match(kalshi_market)
-        
-        if not match:
-            print(f"❌ No Polymarket match for {kalshi_ticker} - {kalshi_title}")
-            continue
+def _items_for_game(kalshi_markets, match):
+    """Evaluates the team markets of one game against its Polymarket market."""
+    outcomes, prices = polymarket_prices(match)
+    if not outcomes or not prices:
+        return []
+    observed_at = datetime.now().isoformat()
+    items = [{
+        "kalshi_ticker": market.ticker,
+        "kalshi_title": market.title,
+        "league": kalshi_league(market.ticker),
+        "polymarket_slug": match.slug,
+        "outcomes": outcomes,
+        "polymarket_prices": prices,
+        "kalshi_yes": market.yes_ask_dollars,
+        "kalshi_no": market.no_ask_dollars,
+        "observed_at": observed_at,
+    } for market in kalshi_markets]
+    # Teams the dictionary doesn't know (fuzzy matches) are placed by name
+    team_outcomes = {market.ticker: outcome_index(market, outcomes) for market in kalshi_markets
+                     if not parse_ticker(market.ticker) and len(outcomes) == 2}
+    team_outcomes = {ticker: i for ticker, i in team_outcomes.items() if i is not None}
+    for item in detect_arbitrage(items, team_outcomes):
+        item["best_profit"] = _best_profit(item)
+    return items
 
-        polymarket_slug = match.get('slug') or (match.get('final_url', '').split('/')[-1])
-        outcomes, price_list = fetch_polymarket_prices(polymarket_slug)
+async def scan(client, matcher, series_tickers, concurrency):
+    """
+    Async generator over evaluated pairs. Kalshi series are streamed concurrently
+    and each game is resolved against Polymarket once (its first team market
+    starts the lookup, at most `concurrency` in flight); a game's pairs are
+    yielded as soon as its lookup has finished.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    games, pending = {}, set()
 
-        if not outcomes or not price_list:
-            print(f"❌ Could not fetch Polymarket prices for {polymarket_slug}")
-            continue
-        
-        arb_opps = detect_arbitrage(kalshi_market, polymarket_slug, outcomes, price_list)
-        item = {
-            "kalshi_ticker": kalshi_ticker,
-            "kalshi_title": kalshi_title,
-            "polymarket_slug": polymarket_slug,
-            "outcomes": outcomes,
-            "polymarket_prices": price_list,
-            "kalshi_yes": kalshi_market.get('yes_ask_dollars'),
-            "kalshi_no": kalshi_market.get('no_ask_dollars'),
-            "arbitrage_opportunities": arb_opps
-        }
-        results.append(item)
-
-        # Print arbitrage opportunities
-        if arb_opps:
-            print(f"\n===== ARBITRAGE FOUND =====\nKalshi: {kalshi_ticker} | {kalshi_title}")
-            print(f"Polymarket: {polymarket_slug}")
-            for arb in arb_opps:
-                print(f"Outcome: {arb['outcome']}")
-                print(f"Type: {arb['type']}")
-                print(f"  Kalshi YES: {item['kalshi_yes']}, Kalshi NO: {item['kalshi_no']}")
-                print(f"  Polymarket YES: {price_list[outcomes.index(arb['outcome'])]}, NO: {1 - price_list[outcomes.index(arb['outcome'])]}")
-                print(f"  Cost: {arb['cost']:.3f}, Guaranteed Profit: {arb['profit']:.3f}\n")
-            print(f"==========================\n")
-        else:
-            print(f"No arbitrage for: {kalshi_ticker} ({kalshi_title})")
-
-    with open("arbitrage_opportunities.json", "w") as f:
-        json.dump(results, f, indent=2)
-
-    print("\nResults saved to arbitrage_opportunities.json")
+    async def resolve(game, market):
+        async with semaphore:
+            try:
+                return game, await matcher.find_polymarket_match_async(market, client)
+            except Exception as e:
+                _log(f"Polymarket lookup failed for {game}: {e!r}")
+                return game, None
+
+    if matcher.catalog is not None:
+        await matcher.catalog.load(client)
+    async for market in stream_open_markets(client, series_tickers):
+        # A game is keyed by its slug, or by its Kalshi event when only the catalog's fuzzy index can match it
+        game = (matcher._exact_match_sports_slug(market.ticker) or market.event_ticker
+                or market.ticker.rsplit('-', 1)[0])
+        if game not in games:
+            games[game] = []
+            pending.add(asyncio.create_task(resolve(game, market)))
+        games[game].append(market)
+        # Emit games resolved so far while the Kalshi stream is still paging
+        done = {task for task in pending if task.done()}
+        pending -= done
+        for task in done:
+            game, match = task.result()
+            for item in _items_for_game(games.pop(game), match) if match else ():
+                yield item
+    for next_done in asyncio.as_completed(pending):
+        game, match = await next_done
+        for item in _items_for_game(games.pop(game), match) if match else ():
+            yield item
+
+async def run(args, out):
+    """One pass, or a pass every --interval seconds with --watch; returns the number of lines written."""
+    series_tickers = args.series
+    emitted = {}  # kalshi_ticker -> fingerprint of the last line written for it (watch mode)
+    lines = 0
+    async with async_client(args.concurrency + len(series_tickers)) as client:
+        pass_number = 0
+        while True:
+            pass_number += 1
+            catalog = PolymarketCatalog(args.league) if args.catalog else None
+            matcher = MarketMatcher(catalog=catalog)
+            start = time.perf_counter()
+            evaluated = written = 0
+            seen = set()
+            try:
+                async for item in scan(client, matcher, series_tickers, args.concurrency):
+                    evaluated += 1
+                    if not _wanted(item, args.min_profit):
+                        continue
+                    seen.add(item["kalshi_ticker"])
+                    fingerprint = _fingerprint(item)
+                    if args.watch and emitted.get(item["kalshi_ticker"]) == fingerprint:
+                        continue
+                    emitted[item["kalshi_ticker"]] = fingerprint
+                    out.write(json.dumps(item) + "\n")
+                    out.flush()
+                    written += 1
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                if not args.watch:
+                    raise
+                # A failed pass saw only part of the markets, so nothing is reported removed
+                lines += written
+                _log(f"Pass {pass_number} failed after {written} lines: {e!r}; retrying in {args.interval}s")
+                await asyncio.sleep(args.interval)
+                continue
+            if args.watch:
+                for ticker in [t for t in emitted if t not in seen]:
+                    del emitted[ticker]
+                    out.write(json.dumps({"kalshi_ticker": ticker, "removed": True}) + "\n")
+                    written += 1
+                out.flush()
+            lines += written
+            _log(f"Pass {pass_number}: {evaluated} pairs evaluated, {written} lines written "
+                 f"in {time.perf_counter() - start:.2f}s")
+            if not args.watch:
+                return lines
+            await asyncio.sleep(args.interval)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan Kalshi game markets against Polymarket and stream JSONL")
+    parser.add_argument("--league", nargs="+", type=str.upper, choices=list(SERIES_BY_LEAGUE),
+                        default=list(SERIES_BY_LEAGUE), help="leagues to scan (default: all)")
+    parser.add_argument("--series", nargs="+", type=str.upper,
+                        help="explicit Kalshi series tickers (overrides --league); series outside the known "
+                             "leagues are matched fuzzily and need --catalog")
+    parser.add_argument("--min-profit", type=float, default=None,
+                        help="only emit pairs whose best opportunity earns more than this ($/contract)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Polymarket lookups in flight")
+    parser.add_argument("--catalog", action="store_true",
+                        help="load the Polymarket events catalog first instead of one request per game")
+    parser.add_argument("--output", "-o", default="-", help="JSONL file to append to (default: stdout)")
+    parser.add_argument("--watch", action="store_true", help="rescan forever, emitting only changed pairs")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help="seconds between --watch passes")
+    args = parser.parse_args(argv)
+    if args.series:
+        # Only the dictionary leagues' game tickers resolve to Polymarket slugs; other series (KX<LEAGUE>GAME)
+        # are matched by the catalog's fuzzy index, whose Gamma sport comes from LEAGUE_GAMMA_SPORTS
+        leagues = {series: kalshi_league(series) for series in args.series}
+        unknown = [series for series, league in leagues.items() if league not in SERIES_BY_LEAGUE]
+        if unknown and not args.catalog:
+            parser.error(f"series outside the known leagues ({', '.join(SERIES_BY_LEAGUE)}) need --catalog: "
+                         f"{', '.join(unknown)}")
+        args.league = list(dict.fromkeys(leagues.values()))
+    else:
+        args.series = [t for league in args.league for t in SERIES_BY_LEAGUE[league]]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = sys.stdout if args.output == "-" else open(args.output, "a")
+    try:
+        return asyncio.run(run(args, out))
+    except KeyboardInterrupt:
+        _log("Interrupted")
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 if __name__ == "__main__":
     main()
-